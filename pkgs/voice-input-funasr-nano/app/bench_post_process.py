@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for post_process_text over history.jsonl raw_text values.
+
+Compares the precompiled rule engine in main.py with the previous per-call
+re.sub implementation (kept below as the reference) and checks that both
+produce identical output. Run it from the app directory of the sherpa-onnx or
+funasr-nano package, e.g. ``python bench_post_process.py --main ../../voice-input-sherpa-onnx/app/main.py``.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import re
+import time
+
+SAMPLE_TEXTS = [
+    "一我今天用 open ai 的 chat g p t 写了一个 api",
+    "嗯这个 codex 的 perform 还不错，，就是 g p t four point one 有点慢",
+    "一二三四五六七八九 四点",
+    "我们在 english 课上讲 abc，1，2，3",
+    "open 人 i 的 agent 和 ent ent 工具",
+]
+
+
+def reference_normalize_tech_phrases(text):
+    # Phrase-level normalization for common mixed zh/en ASR variants.
+    rules = [
+        (r"\bopen(?:[\s，,]+)*(?:a\s*i|ai|ei|eg|en|and\s+ai)\b", "OpenAI"),
+        (r"\bopopen(?:[\s，,]+)*ai\b", "OpenAI"),
+        (r"\bopen[\s，,]*(?:人|仁|en)[\s，,]*i\b", "OpenAI"),
+        (r"\bopenai[\s，,]+i\b", "OpenAI"),
+        (r"\bchat[\s，,]*g[\s，,]*p[\s，,]*t\b", "ChatGPT"),
+        (r"\bg[\s，,]*p[\s，,]*t\b", "GPT"),
+        (r"\b(?:code[\s，,]*x|de[\s，,]*lex|xcode)(?:[\s，,]+[a-z]{1,3})?\b", "Codex"),
+        (r"\bag+agent\b", "agent"),
+        (r"\benent\b", "agent"),
+        (r"\bent(?:[\s，,]+ent)+\b", "agent"),
+        (r"\bperfor(?:m|form|forform)\b", "performance"),
+        (r"\bperm+?i\b", "performance"),
+    ]
+    for pattern, repl in rules:
+        text = re.sub(pattern, repl, text, flags=re.IGNORECASE)
+    return text
+
+
+def reference_post_process_text(text, policy):
+    text = text.strip()
+    # Drop common Mandarin filler syllables at sentence start, e.g. "一我今天..."
+    text = re.sub(r"^[一啊嗯呃额]\s*(?=[我你他她它这那今明昨])", "", text)
+    # Keep Mandarin + English + digits and common punctuation, drop other scripts.
+    text = re.sub(r"[^0-9A-Za-z\u4e00-\u9fff\s，。！？、,:;.!?\-_'\"()（）【】\[\]]+", "", text)
+    if policy == "light-normalize":
+        text = text.replace("：", "，").replace(":", "，")
+        text = text.replace("；", "，").replace(";", "，")
+        text = re.sub(r"[，,]{2,}", "，", text)
+        text = re.sub(r"[。.!！？?]{2,}", lambda m: m.group(0)[0], text)
+        text = re.sub(r"\s*[，]\s*", "，", text)
+
+    # Common dictation corrections for zh+en usage.
+    replacement_rules = [
+        (r"一二三", "123"),
+        (r"四五六", "456"),
+        (r"七八九", "789"),
+        (r"四点一", "4.1"),
+        (r"四点(?=[\s，,。.!！？?]*$)", "4.1"),
+        (r"\bfour\s+point\s+one\b", "4.1"),
+        (r"\bfor\s+point\s+one\b", "4.1"),
+        (r"\bone\s+four\s+point\b", "4.1"),
+        (r"\bgpt[\s，,]*four\s+point(?:\s+one)?\b", "GPT 4.1"),
+        (r"\bopopen\s*ai\b", "OpenAI"),
+        (r"\bopen\s*a\s*i\b", "OpenAI"),
+        (r"\bchat\s*g\s*p\s*t\b", "ChatGPT"),
+        (r"\benglish\b", "English"),
+        (r"\babc\b", "ABC"),
+        (r"\bapi\b", "API"),
+    ]
+    for pattern, repl in replacement_rules:
+        text = re.sub(pattern, repl, text, flags=re.IGNORECASE)
+
+    text = reference_normalize_tech_phrases(text)
+
+    # Merge spaced letter abbreviations and uppercase them, e.g. "g p t" -> "GPT".
+    text = re.sub(
+        r"\b([A-Za-z])(?:\s+([A-Za-z])){1,6}\b",
+        lambda m: re.sub(r"\s+", "", m.group(0)).upper(),
+        text,
+    )
+
+    text = re.sub(
+        r"(?<!\d)(?:\d\s*[、,，]\s*)+\d(?!\d)",
+        lambda m: re.sub(r"\D", "", m.group(0)),
+        text,
+    )
+    if text:
+        text += " "
+    return text
+
+
+def load_main(path):
+    spec = importlib.util.spec_from_file_location("voice_input_main", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_corpus(paths):
+    texts = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for ln in f:
+                ln = ln.strip()
+                if not ln:
+                    continue
+                try:
+                    obj = json.loads(ln)
+                except json.JSONDecodeError:
+                    continue
+                t = obj.get("raw_text")
+                if isinstance(t, str) and t.strip():
+                    texts.append(t)
+    return texts
+
+
+def time_calls(fn, texts, policy, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for t in texts:
+            fn(t, policy)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    p = argparse.ArgumentParser(description="Benchmark post_process_text against the reference implementation.")
+    p.add_argument("--main", default=os.path.join(here, "main.py"), help="main.py to benchmark")
+    p.add_argument(
+        "--history",
+        action="append",
+        default=None,
+        help="History jsonl path (repeatable)",
+    )
+    p.add_argument("--policy", default="light-normalize", help="Punctuation policy")
+    p.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is reported)")
+    args = p.parse_args()
+
+    histories = args.history or [
+        os.path.expanduser("~/.local/state/voice-input-funasr-nano/history.jsonl"),
+        os.path.expanduser("~/.local/state/voice-input-sherpa-onnx/history.jsonl"),
+    ]
+    texts = load_corpus(histories)
+    if not texts:
+        print("no history raw_text found, using built-in samples")
+        texts = SAMPLE_TEXTS * 200
+
+    mod = load_main(args.main)
+    mismatches = 0
+    for t in texts:
+        if mod.post_process_text(t, args.policy) != reference_post_process_text(t, args.policy):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"mismatch: {t!r}")
+
+    ref = time_calls(reference_post_process_text, texts, args.policy, args.repeat)
+    new = time_calls(mod.post_process_text, texts, args.policy, args.repeat)
+    n = len(texts)
+    print(f"corpus: {n} texts, mismatches: {mismatches}")
+    print(f"reference: {ref * 1e6 / n:8.1f} us/text")
+    print(f"compiled:  {new * 1e6 / n:8.1f} us/text  ({ref / new:.2f}x)")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
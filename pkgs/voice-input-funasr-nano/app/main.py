@@ -4,25 +4,40 @@ import io
 import os
 import queue
 import re
+import select
 import shutil
 import signal
 import subprocess
 import sys
-import tempfile
 import threading
 import time
 import json
+import atexit
 import difflib
 from datetime import datetime, timezone
-from contextlib import redirect_stderr, redirect_stdout
+from contextlib import nullcontext, redirect_stderr, redirect_stdout
 from functools import lru_cache
 
 import numpy as np
 import sounddevice as sd
-import soundfile as sf
 import yaml
 from pynput import keyboard
 
+try:
+    from Xlib import X, XK, Xatom
+    from Xlib import display as xdisplay
+    from Xlib import error as xerror
+    from Xlib.protocol import event as xevent
+except ImportError:  # python-xlib not packaged; paste through xclip/xdotool
+    xdisplay = None
+
+try:
+    from jeepney import DBusAddress, new_method_call
+    from jeepney.io.blocking import open_dbus_connection
+    from jeepney.wrappers import unwrap_msg
+except ImportError:  # jeepney not packaged; notify through notify-send
+    open_dbus_connection = None
+
 NOISY_RUNTIME_PATTERNS = (
     "Warning, miss key in ckpt:",
     "WARNING:root:trust_remote_code",
@@ -85,21 +100,122 @@ def load_config():
         return yaml.safe_load(f) or {}
 
 
-def notify(msg, expire_ms=None, replace_id=None):
-    if not shutil.which("notify-send"):
-        return replace_id
-    cmd = ["notify-send"]
-    if replace_id is not None:
-        cmd.extend(["-r", str(replace_id)])
-    if expire_ms is not None:
-        cmd.extend(["-t", str(int(expire_ms))])
-    cmd.extend(["-p", "Voice Input FunASR", msg])
-    try:
-        r = subprocess.run(cmd, capture_output=True, text=True, check=False)
-        out = (r.stdout or "").strip()
-        return int(out) if out.isdigit() else replace_id
-    except Exception:
-        return replace_id
+# Desktop notifications over one resident D-Bus connection, sent from a worker thread.
+class Notifier:
+    def __init__(self, title):
+        self.title = title
+        self._queue = queue.Queue()
+        self._ids = {}
+        self._conn = None
+        self._dbus_disabled = open_dbus_connection is None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def send(self, msg, expire_ms=None, slot=None):
+        self._put(("notify", slot, msg, expire_ms))
+
+    def close(self, slot):
+        self._put(("close", slot, None, None))
+
+    def flush(self, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _put(self, item):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        self._queue.put(item)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Updates pile up behind a slow daemon; only the newest per slot matters.
+            newest = {item[1]: i for i, item in enumerate(batch) if item[1] is not None}
+            for i, (kind, slot, msg, expire_ms) in enumerate(batch):
+                if slot is None or newest[slot] == i:
+                    try:
+                        self._deliver(kind, slot, msg, expire_ms)
+                    except Exception:
+                        pass
+                self._queue.task_done()
+
+    def _connection(self):
+        if self._conn is None and not self._dbus_disabled:
+            try:
+                self._conn = open_dbus_connection(bus="SESSION")
+            except Exception:
+                self._dbus_disabled = True
+        return self._conn
+
+    def _call(self, method, signature, body):
+        msg = new_method_call(
+            DBusAddress(
+                "/org/freedesktop/Notifications",
+                bus_name="org.freedesktop.Notifications",
+                interface="org.freedesktop.Notifications",
+            ),
+            method,
+            signature,
+            body,
+        )
+        return unwrap_msg(self._conn.send_and_get_reply(msg, timeout=5))
+
+    def _deliver(self, kind, slot, msg, expire_ms):
+        replace_id = self._ids.get(slot, 0) if slot is not None else 0
+        if kind == "close":
+            if not replace_id:
+                return
+            del self._ids[slot]
+        if self._connection() is not None:
+            try:
+                if kind == "close":
+                    self._call("CloseNotification", "u", (replace_id,))
+                    return
+                expire = -1 if expire_ms is None else int(expire_ms)
+                nid = self._call(
+                    "Notify",
+                    "susssasa{sv}i",
+                    (self.title, replace_id, "", self.title, msg, [], {}, expire),
+                )[0]
+                if slot is not None:
+                    self._ids[slot] = nid
+                return
+            except Exception:
+                # Reconnect on the next message; deliver this one via notify-send.
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+        if not shutil.which("notify-send"):
+            return
+        if kind == "close":
+            msg, expire_ms = " ", 1
+        cmd = ["notify-send"]
+        if replace_id:
+            cmd.extend(["-r", str(replace_id)])
+        if expire_ms is not None:
+            cmd.extend(["-t", str(int(expire_ms))])
+        cmd.extend(["-p", self.title, msg])
+        out = subprocess.run(cmd, capture_output=True, text=True, timeout=5, check=False).stdout.strip()
+        if slot is not None and kind == "notify" and out.isdigit():
+            self._ids[slot] = int(out)
+
+
+NOTIFIER = Notifier("Voice Input FunASR")
+
+
+def notify(msg, expire_ms=None, slot=None):
+    NOTIFIER.send(msg, expire_ms=expire_ms, slot=slot)
 
 
 def to_bool(v, default=False):
@@ -160,17 +276,32 @@ def norm_token(key):
     return ""
 
 
+_window_class_cache = {}
+_window_class_lock = threading.Lock()
+
+
 def get_window_class(window_id):
-    try:
-        return subprocess.run(
-            ["xprop", "-id", window_id, "WM_CLASS"],
-            capture_output=True,
-            text=True,
-            timeout=2,
-            check=False,
-        ).stdout.lower()
-    except Exception:
-        return ""
+    # WM_CLASS is fixed for a window's lifetime: query xprop once per window id.
+    # The lock makes a caller wait for an in-flight query instead of forking again.
+    with _window_class_lock:
+        cls = _window_class_cache.get(window_id)
+        if cls is not None:
+            return cls
+        try:
+            cls = subprocess.run(
+                ["xprop", "-id", window_id, "WM_CLASS"],
+                capture_output=True,
+                text=True,
+                timeout=2,
+                check=False,
+            ).stdout.lower()
+        except Exception:
+            return ""
+        if cls:
+            if len(_window_class_cache) >= 256:
+                _window_class_cache.clear()
+            _window_class_cache[window_id] = cls
+        return cls
 
 
 def is_terminal_window(window_id):
@@ -186,6 +317,265 @@ def is_kitty_window(window_id):
     return "kitty" in get_window_class(window_id)
 
 
+_PASTE_KEY_NAMES = {
+    "ctrl": "Control_L",
+    "shift": "Shift_L",
+    "alt": "Alt_L",
+    "super": "Super_L",
+}
+
+
+# Resident paste path: owns CLIPBOARD and types the paste chord via XTEST.
+class X11Injector:
+    def __init__(self, focus_timeout=0.25, focus_settle=0.05):
+        if xdisplay is None:
+            raise RuntimeError("python-xlib is not installed")
+        self.focus_timeout = focus_timeout
+        self.focus_settle = focus_settle
+        self._dpy = xdisplay.Display()
+        if not self._dpy.has_extension("XTEST"):
+            self._dpy.close()
+            raise RuntimeError("X server has no XTEST extension")
+        self._sel = xdisplay.Display()
+        self._sel.set_error_handler(lambda *args: None)
+        self._clipboard = self._sel.intern_atom("CLIPBOARD")
+        self._targets = self._sel.intern_atom("TARGETS")
+        self._utf8 = self._sel.intern_atom("UTF8_STRING")
+        self._text = self._sel.intern_atom("TEXT")
+        self._text_targets = {
+            self._utf8,
+            self._text,
+            Xatom.STRING,
+            self._sel.intern_atom("text/plain"),
+            self._sel.intern_atom("text/plain;charset=utf-8"),
+        }
+        self._owner = self._sel.screen().root.create_window(0, 0, 1, 1, 0, X.CopyFromParent)
+        # Larger payloads need the INCR protocol; leave those to xclip.
+        self._max_bytes = (self._sel.info.max_request_length << 2) - 64
+        self._data = b""
+        self._latin1 = b""
+        self._data_lock = threading.Lock()
+        self._owned = threading.Event()
+        self._inject_lock = threading.Lock()
+        self._wake_r, self._wake_w = os.pipe()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        d = self._sel
+        d.flush()
+        while True:
+            while d.pending_events():
+                ev = d.next_event()
+                if ev.type == X.SelectionRequest:
+                    self._answer(ev)
+                elif ev.type == X.SelectionClear and ev.atom == self._clipboard:
+                    self._owned.clear()
+            ready, _, _ = select.select([d.fileno(), self._wake_r], [], [])
+            if self._wake_r in ready:
+                os.read(self._wake_r, 64)
+                self._owner.set_selection_owner(self._clipboard, X.CurrentTime)
+                if d.get_selection_owner(self._clipboard) == self._owner:
+                    self._owned.set()
+
+    def _answer(self, ev):
+        with self._data_lock:
+            data, latin1 = self._data, self._latin1
+        targets = self._text_targets
+        if latin1 is None:
+            targets = targets - {Xatom.STRING}
+        prop = ev.property or ev.target
+        if ev.target == self._targets:
+            ev.requestor.change_property(prop, Xatom.ATOM, 32, [self._targets, *targets])
+        elif ev.target == Xatom.STRING and latin1 is not None:
+            # STRING is Latin-1; text outside it is only offered as UTF8_STRING.
+            ev.requestor.change_property(prop, Xatom.STRING, 8, latin1)
+        elif ev.target in targets:
+            ptype = self._utf8 if ev.target == self._text else ev.target
+            ev.requestor.change_property(prop, ptype, 8, data)
+        else:
+            prop = X.NONE
+        ev.requestor.send_event(
+            xevent.SelectionNotify(
+                time=ev.time,
+                requestor=ev.requestor,
+                selection=ev.selection,
+                target=ev.target,
+                property=prop,
+            )
+        )
+        self._sel.flush()
+
+    def _take_clipboard(self, text):
+        data = text.encode("utf-8")
+        if len(data) > self._max_bytes:
+            raise RuntimeError("text too large for a single selection transfer")
+        try:
+            latin1 = text.encode("latin-1")
+        except UnicodeEncodeError:
+            latin1 = None
+        with self._data_lock:
+            self._data = data
+            self._latin1 = latin1
+        self._owned.clear()
+        os.write(self._wake_w, b"\0")
+        if not self._owned.wait(1.0):
+            raise RuntimeError("could not take clipboard ownership")
+
+    def _focus_within(self, wid):
+        win = self._dpy.get_input_focus().focus
+        for _ in range(32):
+            if isinstance(win, int) or not win.id:
+                return False
+            if win.id == wid:
+                return True
+            win = win.query_tree().parent
+        return False
+
+    def _focus(self, wid):
+        catch = xerror.CatchError()
+        self._dpy.create_resource_object("window", wid).set_input_focus(
+            X.RevertToParent, X.CurrentTime, onerror=catch
+        )
+        self._dpy.sync()
+        if catch.get_error():
+            raise RuntimeError(f"cannot focus window {wid}")
+        # The server applies focus in request order, so this normally holds on
+        # the first query; the loop only covers window managers that redirect it.
+        deadline = time.monotonic() + self.focus_timeout
+        while not self._focus_within(wid):
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"window {wid} did not take focus")
+            time.sleep(0.005)
+        # Some apps drop keys that arrive right after FocusIn.
+        time.sleep(self.focus_settle)
+
+    def _keycode(self, name):
+        code = self._dpy.keysym_to_keycode(XK.string_to_keysym(_PASTE_KEY_NAMES.get(name, name)))
+        if not code:
+            raise RuntimeError(f"no keycode for {name}")
+        return code
+
+    def _held_modifiers(self):
+        keymap = self._dpy.query_keymap()
+        return [
+            code
+            for codes in self._dpy.get_modifier_mapping()
+            for code in codes
+            if code and keymap[code >> 3] & (1 << (code & 7))
+        ]
+
+    def _send_keys(self, keys):
+        chords = [[self._keycode(k) for k in key.split("+")] for key in keys]
+        # Same effect as xdotool --clearmodifiers: lift held modifiers, then restore.
+        held = self._held_modifiers()
+        for code in held:
+            self._dpy.xtest_fake_input(X.KeyRelease, code)
+        try:
+            for chord in chords:
+                for code in chord:
+                    self._dpy.xtest_fake_input(X.KeyPress, code)
+                for code in reversed(chord):
+                    self._dpy.xtest_fake_input(X.KeyRelease, code)
+        finally:
+            for code in held:
+                self._dpy.xtest_fake_input(X.KeyPress, code)
+            self._dpy.sync()
+
+    def paste(self, window_id, text, keys):
+        with self._inject_lock:
+            self._take_clipboard(text)
+            self._focus(int(window_id))
+            self._send_keys(keys)
+
+
+def create_injector(backend):
+    if backend == "xdotool" or (backend != "xlib" and not os.environ.get("DISPLAY")):
+        return None
+    try:
+        return X11Injector()
+    except Exception as e:
+        print(f"native X11 injection unavailable, using xdotool: {e}", flush=True)
+        if backend == "xlib":
+            notify(f"inject_backend xlib unavailable, using xdotool: {e}")
+        return None
+
+
+# Short earcons, inspired by voice dictation UI cues: (frequency Hz, seconds).
+EARCON_THEMES = {
+    "wispr-like": {
+        "start": (987.77, 0.050),
+        "stop": (659.25, 0.060),
+        "done": (523.25, 0.050),
+    },
+    "classic": {
+        "start": (880.0, 0.050),
+        "stop": (660.0, 0.060),
+        "done": (520.0, 0.050),
+    },
+}
+
+
+def render_earcon(freq, dur, sr):
+    n = max(1, int(sr * dur))
+    t = np.arange(n, dtype=np.float32) / np.float32(sr)
+    env = np.linspace(1.0, 0.75, n, dtype=np.float32)
+    return (0.12 * np.sin(2.0 * np.pi * np.float32(freq) * t) * env).astype(np.float32)
+
+
+# Earcons rendered once and played through one resident output stream.
+class EarconPlayer:
+    def __init__(self, theme, sr=24000):
+        self.sr = sr
+        self.tones = {
+            name: {event: render_earcon(freq, dur, sr) for event, (freq, dur) in events.items()}
+            for name, events in EARCON_THEMES.items()
+        }
+        self.theme = theme if theme in self.tones else "classic"
+        self._lock = threading.Lock()
+        self._buf = None
+        self._pos = 0
+        self._stream = None
+        try:
+            self._stream = sd.OutputStream(
+                samplerate=sr,
+                channels=1,
+                dtype="float32",
+                latency="low",
+                callback=self._callback,
+            )
+            self._stream.start()
+        except Exception as e:
+            self._stream = None
+            print(f"earcon stream unavailable, playing per tone: {e}", flush=True)
+
+    def _callback(self, outdata, frames, time_info, status):
+        with self._lock:
+            buf, pos = self._buf, self._pos
+            if buf is None:
+                outdata.fill(0)
+                return
+            n = min(frames, len(buf) - pos)
+            outdata[:n, 0] = buf[pos:pos + n]
+            outdata[n:] = 0
+            self._pos = pos + n
+            if self._pos >= len(buf):
+                self._buf = None
+
+    def play(self, event):
+        wave = self.tones[self.theme].get(event)
+        if wave is None:
+            return
+        if self._stream is not None and self._stream.active:
+            with self._lock:
+                self._buf = wave
+                self._pos = 0
+            return
+        try:
+            sd.play(wave, self.sr, blocking=False)
+        except Exception:
+            return
+
+
 def load_replacements_file(path):
     rules = []
     if not os.path.exists(path):
@@ -218,13 +608,38 @@ def load_replacements_sources(spec):
     return rules
 
 
-def append_jsonl(path, obj):
-    try:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-    except Exception:
-        pass
+def pathspec_signature(spec):
+    sig = []
+    for p in str(spec).split(os.pathsep):
+        p = p.strip()
+        if not p:
+            continue
+        path = os.path.expanduser(p)
+        try:
+            st = os.stat(path)
+            sig.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append((path, None, None))
+    return tuple(sig)
+
+
+# Parsed pathspec, reloaded only when a file's (path, mtime, size) changes.
+class CachedSource:
+    def __init__(self, spec, loader, build=None):
+        self.spec = spec
+        self.loader = loader
+        self.build = build or (lambda data: data)
+        self.data = None
+        self.value = None
+        self._sig = None
+
+    def get(self):
+        sig = pathspec_signature(self.spec)
+        if sig != self._sig:
+            self.data = self.loader(self.spec)
+            self.value = self.build(self.data)
+            self._sig = sig
+        return self.value
 
 
 def load_json(path, default):
@@ -235,11 +650,20 @@ def load_json(path, default):
         return default
 
 
-def save_json(path, data):
+def write_atomic(path, text):
+    # Write to a sibling temp file and rename, so readers never see a torn file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def save_json(path, data, indent=2):
     try:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_atomic(path, json.dumps(data, ensure_ascii=False, indent=indent))
     except Exception:
         pass
 
@@ -264,8 +688,10 @@ def upsert_replacement_rule(path, wrong, right):
         if not s or s.startswith("#") or "=>" not in s:
             out.append(ln)
             continue
-        left, _ = s.split("=>", 1)
+        left, old_right = s.split("=>", 1)
         if left.strip().lower() == wrong.lower():
+            if left.strip() == wrong and old_right.strip() == right:
+                return  # mapping unchanged, skip the rewrite
             out.append(f"{wrong} => {right}")
             found = True
         else:
@@ -275,12 +701,7 @@ def upsert_replacement_rule(path, wrong, right):
             out.append("")
         out.append(f"{wrong} => {right}")
     try:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            if out:
-                f.write("\n".join(out) + "\n")
-            else:
-                f.write(f"{wrong} => {right}\n")
+        write_atomic(path, "\n".join(out) + "\n")
     except Exception:
         pass
 
@@ -289,17 +710,13 @@ def learning_tokens(text):
     return re.findall(r"[A-Za-z0-9]+|[\u4e00-\u9fff]+", text)
 
 
-def auto_learn_corrections(raw_text, final_text, tech_words, state_path, auto_rules_path, min_hits=2):
+def auto_learn_corrections(raw_text, final_text, tech_words, store, auto_rules_path, min_hits=2):
+    # ``store`` is a LearningStore; it persists the pair counts itself.
     raw_toks = learning_tokens(raw_text)
     fin_toks = learning_tokens(final_text)
     if not raw_toks or not fin_toks:
         return []
 
-    state = load_json(state_path, {"pairs": {}})
-    pairs = state.get("pairs", {})
-    if not isinstance(pairs, dict):
-        pairs = {}
-
     canon = {w.lower() for w in tech_words if isinstance(w, str) and w.strip()}
     blocked_wrong = {
         "code", "open", "ai", "model", "performance", "agent",
@@ -341,16 +758,194 @@ def auto_learn_corrections(raw_text, final_text, tech_words, state_path, auto_ru
             continue
 
         key = f"{wrong_phrase.lower()}\t{right_low}"
-        pairs[key] = int(pairs.get(key, 0)) + 1
-        if pairs[key] >= min_hits:
+        if store.increment(key) >= min_hits:
             upsert_replacement_rule(auto_rules_path, wrong_phrase, right)
             learned.append((wrong_phrase, right))
 
-    state["pairs"] = pairs
-    save_json(state_path, state)
     return learned
 
 
+# Learning counts: JSON snapshot plus an append-only log, folded in every compact_every records.
+class LearningStore:
+    def __init__(self, path, compact_every=5000):
+        self.path = path
+        self.log_path = f"{path}.log"
+        self.compact_every = compact_every
+        snap = load_json(path, {})
+        if not isinstance(snap, dict):
+            snap = {}
+        pairs = snap.get("pairs", {})
+        self.pairs = {}
+        if isinstance(pairs, dict):
+            for k, v in pairs.items():
+                try:
+                    self.pairs[str(k)] = int(v)
+                except (TypeError, ValueError):
+                    continue
+        self.gen = int(snap.get("log_gen", 0) or 0)
+        self._log = None
+        self._torn = False
+        self._pending = self._replay()
+        if self._pending is None:
+            self._pending = 0
+            self._reset_log()
+
+    def _replay(self):
+        # Returns the number of replayed records, or None if the log is unusable.
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "null")
+                if not isinstance(header, dict) or header.get("gen") != self.gen:
+                    return None
+                n = 0
+                for ln in f:
+                    self._torn = not ln.endswith("\n")
+                    try:
+                        key, delta = json.loads(ln)
+                        self.pairs[key] = self.pairs.get(key, 0) + int(delta)
+                        n += 1
+                    except Exception:
+                        continue  # torn tail after a crash
+                return n
+        except Exception:
+            return None
+
+    def _reset_log(self):
+        try:
+            write_atomic(self.log_path, json.dumps({"gen": self.gen}) + "\n")
+        except Exception as e:
+            print(f"learning log reset failed: {e}", flush=True)
+
+    def increment(self, key, delta=1):
+        self.pairs[key] = self.pairs.get(key, 0) + delta
+        try:
+            if self._log is None:
+                self._log = open(self.log_path, "a", encoding="utf-8")
+                if self._torn:
+                    self._log.write("\n")
+                    self._torn = False
+            self._log.write(json.dumps([key, delta], ensure_ascii=False) + "\n")
+            self._pending += 1
+        except Exception as e:
+            print(f"learning log append failed: {e}", flush=True)
+            self._log = None
+        return self.pairs[key]
+
+    def flush(self):
+        if self._log is not None:
+            try:
+                self._log.flush()
+            except Exception:
+                pass
+        if self._pending >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        try:
+            write_atomic(
+                self.path,
+                json.dumps({"pairs": self.pairs, "log_gen": self.gen + 1}, ensure_ascii=False),
+            )
+        except Exception as e:
+            print(f"learning snapshot failed: {e}", flush=True)
+            return
+        self.gen += 1
+        if self._log is not None:
+            try:
+                self._log.close()
+            except Exception:
+                pass
+            self._log = None
+        self._reset_log()
+        self._torn = False
+        self._pending = 0
+
+    def close(self):
+        if self._pending:
+            self.compact()
+        elif self._log is not None:
+            try:
+                self._log.close()
+            except Exception:
+                pass
+            self._log = None
+
+
+# Background owner of the history file and the learning state.
+class PersistenceWorker:
+    def __init__(self, history_path, state_path, save_delay=2.0):
+        self.history_path = history_path
+        self.state_path = state_path
+        self.save_delay = save_delay
+        self.store = LearningStore(state_path)
+        self._q = queue.Queue()
+        self._history = None
+        self._dirty_since = None
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, entry, learn=None):
+        # learn is (raw, final, tech_words, rules_path, min_hits).
+        self._q.put((entry, learn))
+
+    def close(self):
+        if self._thread.is_alive():
+            self._q.put(None)
+            self._thread.join(timeout=5)
+
+    def _loop(self):
+        while True:
+            timeout = None
+            if self._dirty_since is not None:
+                timeout = max(0.0, self._dirty_since + self.save_delay - time.monotonic())
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                self._save_state()
+                continue
+            if item is None:
+                break
+            self._handle(*item)
+            if self._q.empty() and self._history is not None:
+                try:
+                    self._history.flush()
+                except Exception:
+                    pass
+        self.store.close()
+        if self._history is not None:
+            try:
+                self._history.close()
+            except Exception:
+                pass
+
+    def _handle(self, entry, learn):
+        if learn is not None:
+            raw_text, final_text, tech_words, rules_path, min_hits = learn
+            try:
+                entry["auto_learned"] = auto_learn_corrections(
+                    raw_text, final_text, tech_words, self.store, rules_path, min_hits=min_hits
+                )
+                if self._dirty_since is None:
+                    self._dirty_since = time.monotonic()
+            except Exception as e:
+                print(f"auto-learn failed: {e}", flush=True)
+        try:
+            if self._history is None:
+                os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+                self._history = open(self.history_path, "a", encoding="utf-8")
+            self._history.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"history write failed: {e}", flush=True)
+            self._history = None
+
+    def _save_state(self):
+        if self._dirty_since is None:
+            return
+        self._dirty_since = None
+        self.store.flush()
+
+
 def load_words_from_path(path):
     words = []
     if not os.path.exists(path):
@@ -379,19 +974,119 @@ def load_words_sources(spec):
     return merged
 
 
-def apply_replacements(text, rules, ignore_case=False):
-    flags = re.IGNORECASE if ignore_case else 0
-    for src, dst in rules:
-        text = re.sub(re.escape(src), dst, text, flags=flags)
-    return text
-
-
-def apply_tech_fuzzy(text, tech_words):
-    if not tech_words:
+# Trie over one rule layer, applied in a single leftmost-longest scan.
+class ReplacementMatcher:
+    def __init__(self, rules, ignore_case=False):
+        self.ignore_case = ignore_case
+        self._root = {}
+        for src, dst in rules:
+            key = self._fold(src) if ignore_case else src
+            if not key:
+                continue
+            node = self._root
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node.setdefault(None, dst)
+
+    @staticmethod
+    def _fold(text):
+        folded = text.lower()
+        if len(folded) == len(text):
+            return folded
+        # Keep offsets aligned with the original text.
+        return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+    def apply(self, text):
+        if not self._root or not text:
+            return text
+        hay = self._fold(text) if self.ignore_case else text
+        root = self._root
+        out = []
+        last = i = 0
+        n = len(hay)
+        while i < n:
+            node = root.get(hay[i])
+            if node is None:
+                i += 1
+                continue
+            j = i + 1
+            end, dst = (j, node[None]) if None in node else (-1, None)
+            while j < n:
+                node = node.get(hay[j])
+                if node is None:
+                    break
+                j += 1
+                if None in node:
+                    end, dst = j, node[None]
+            if end < 0:
+                i += 1
+                continue
+            out.append(text[last:i])
+            out.append(dst)
+            last = i = end
+        if not out:
+            return text
+        out.append(text[last:])
+        return "".join(out)
+
+
+TECH_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z0-9\-\._]{2,}")
+
+
+# Same answer as difflib.get_close_matches(n=1), scoring only words whose ratio bound reaches the cutoff.
+class TechFuzzyIndex:
+    def __init__(self, words, cutoff=0.84):
+        self.words = list(words)
+        self.cutoff = cutoff
+        self.word_map = {w.lower(): w for w in self.words}
+        self._keys = list(self.word_map.keys())
+        self._col = {c: i for i, c in enumerate(sorted({c for k in self._keys for c in k}))}
+        self._counts = np.zeros((len(self._keys), len(self._col)), dtype=np.int32)
+        for r, k in enumerate(self._keys):
+            for c in k:
+                self._counts[r, self._col[c]] += 1
+        self._lens = np.array([len(k) for k in self._keys], dtype=np.int32)
+        self._memo = {}
+
+    def closest(self, low):
+        if low in self._memo:
+            return self._memo[low]
+        best = self._closest(low)
+        if len(self._memo) >= 4096:
+            self._memo.clear()
+        self._memo[low] = best
+        return best
+
+    def _closest(self, low):
+        if not self._keys:
+            return None
+        q = np.zeros(len(self._col), dtype=np.int32)
+        for c in low:
+            i = self._col.get(c)
+            if i is not None:
+                q[i] += 1
+        total = self._lens + len(low)
+        # real_quick_ratio and quick_ratio, computed for every word at once.
+        ok = 2.0 * np.minimum(self._lens, len(low)) / total >= self.cutoff
+        ok &= 2.0 * np.minimum(self._counts, q).sum(axis=1) / total >= self.cutoff
+        s = difflib.SequenceMatcher()
+        s.set_seq2(low)
+        best = None
+        for r in np.flatnonzero(ok):
+            key = self._keys[r]
+            s.set_seq1(key)
+            score = s.ratio()
+            # Same ordering as get_close_matches: highest score, then largest word.
+            if score >= self.cutoff and (best is None or (score, key) > best):
+                best = (score, key)
+        return self.word_map[best[1]] if best else None
+
+
+def apply_tech_fuzzy(text, index):
+    if index is None or not index.words:
         return text
 
-    word_map = {w.lower(): w for w in tech_words}
-    candidates = list(word_map.keys())
+    word_map = index.word_map
 
     def repl(match):
         token = match.group(0)
@@ -400,21 +1095,85 @@ def apply_tech_fuzzy(text, tech_words):
             return word_map[low]
         if len(low) < 4:
             return token
-        m = difflib.get_close_matches(low, candidates, n=1, cutoff=0.84)
-        if not m:
+        chosen = index.closest(low)
+        if chosen is None:
             return token
-        chosen = word_map[m[0]]
-        # For acronyms, keep canonical uppercase.
-        if chosen.isupper():
-            return chosen
         return chosen
 
-    return re.sub(r"[A-Za-z][A-Za-z0-9\-\._]{2,}", repl, text)
+    return TECH_TOKEN_RE.sub(repl, text)
+
+
+# Character-trigram index used to pick hotwords that resemble the first-pass text.
+class HotwordIndex:
+    def __init__(self, words):
+        self.words = list(words)
+        self._grams = []
+        self._postings = {}
+        for i, w in enumerate(self.words):
+            grams = self._trigrams(self._norm(w))
+            self._grams.append(grams)
+            for g in grams:
+                self._postings.setdefault(g, []).append(i)
+
+    @staticmethod
+    def _norm(text):
+        return re.sub(r"[^0-9a-z]+", "", text.lower())
+
+    @staticmethod
+    def _trigrams(s):
+        s = f"^{s}$"
+        return {s[i:i + 3] for i in range(len(s) - 2)}
+
+    def select(self, text, top_k, min_score=0.5):
+        toks = re.findall(r"[A-Za-z0-9]+", text or "")
+        # ASR often splits one term into pieces ("open ai"), so also try joins.
+        spans = set()
+        for i in range(len(toks)):
+            for n in (1, 2, 3):
+                if i + n <= len(toks):
+                    spans.add(self._norm("".join(toks[i:i + n])))
+        scores = {}
+        for span in spans:
+            if len(span) < 2:
+                continue
+            qgrams = self._trigrams(span)
+            hits = {}
+            for g in qgrams:
+                for i in self._postings.get(g, ()):
+                    hits[i] = hits.get(i, 0) + 1
+            for i, n in hits.items():
+                dice = 2.0 * n / (len(qgrams) + len(self._grams[i]))
+                if dice > scores.get(i, 0.0):
+                    scores[i] = dice
+        ranked = sorted(
+            (i for i, sc in scores.items() if sc >= min_score),
+            key=lambda i: (-scores[i], i),
+        )
+        return [self.words[i] for i in ranked[:top_k]]
+
 
+def compile_rules(rules, flags=0):
+    return [(re.compile(p, flags) if isinstance(p, str) else p, repl) for p, repl in rules]
 
-def normalize_tech_phrases(text):
-    # Phrase-level normalization for common mixed zh/en ASR variants.
-    rules = [
+
+def literal_rule(table, flags=0, boundary=""):
+    # One alternation pass for literal rules whose matches cannot overlap or
+    # feed each other; equivalent to applying them one after another.
+    alternation = "|".join(re.escape(k) for k in sorted(table, key=len, reverse=True))
+    lookup = {k.lower(): v for k, v in table.items()}
+    pattern = re.compile(f"{boundary}(?:{alternation}){boundary}", flags)
+    return pattern, lambda m: lookup[m.group(0).lower()]
+
+
+def apply_rules(text, rules):
+    for pattern, repl in rules:
+        text = pattern.sub(repl, text)
+    return text
+
+
+# Phrase-level normalization for common mixed zh/en ASR variants.
+TECH_PHRASE_RULES = compile_rules(
+    [
         (r"\bopen(?:[\s，,]+)*(?:a\s*i|ai|ei|eg|en|and\s+ai)\b", "OpenAI"),
         (r"\bopopen(?:[\s，,]+)*ai\b", "OpenAI"),
         (r"\bopen[\s，,]*(?:人|仁|en)[\s，,]*i\b", "OpenAI"),
@@ -427,30 +1186,14 @@ def normalize_tech_phrases(text):
         (r"\bent(?:[\s，,]+ent)+\b", "agent"),
         (r"\bperfor(?:m|form|forform)\b", "performance"),
         (r"\bperm+?i\b", "performance"),
-    ]
-    for pattern, repl in rules:
-        text = re.sub(pattern, repl, text, flags=re.IGNORECASE)
-    return text
-
+    ],
+    re.IGNORECASE,
+)
 
-def post_process_text(text, policy):
-    text = text.strip()
-    # Drop common Mandarin filler syllables at sentence start, e.g. "一我今天..."
-    text = re.sub(r"^[一啊嗯呃额]\s*(?=[我你他她它这那今明昨])", "", text)
-    # Keep Mandarin + English + digits and common punctuation, drop other scripts.
-    text = re.sub(r"[^0-9A-Za-z\u4e00-\u9fff\s，。！？、,:;.!?\-_'\"()（）【】\[\]]+", "", text)
-    if policy == "light-normalize":
-        text = text.replace("：", "，").replace(":", "，")
-        text = text.replace("；", "，").replace(";", "，")
-        text = re.sub(r"[，,]{2,}", "，", text)
-        text = re.sub(r"[。.!！？?]{2,}", lambda m: m.group(0)[0], text)
-        text = re.sub(r"\s*[，]\s*", "，", text)
-
-    # Common dictation corrections for zh+en usage.
-    replacement_rules = [
-        (r"一二三", "123"),
-        (r"四五六", "456"),
-        (r"七八九", "789"),
+# Common dictation corrections for zh+en usage.
+DICTATION_RULES = compile_rules(
+    [
+        literal_rule({"一二三": "123", "四五六": "456", "七八九": "789"}),
         (r"四点一", "4.1"),
         (r"四点(?=[\s，,。.!！？?]*$)", "4.1"),
         (r"\bfour\s+point\s+one\b", "4.1"),
@@ -460,27 +1203,53 @@ def post_process_text(text, policy):
         (r"\bopopen\s*ai\b", "OpenAI"),
         (r"\bopen\s*a\s*i\b", "OpenAI"),
         (r"\bchat\s*g\s*p\s*t\b", "ChatGPT"),
-        (r"\benglish\b", "English"),
-        (r"\babc\b", "ABC"),
-        (r"\bapi\b", "API"),
-    ]
-    for pattern, repl in replacement_rules:
-        text = re.sub(pattern, repl, text, flags=re.IGNORECASE)
+        literal_rule(
+            {"english": "English", "abc": "ABC", "api": "API"}, re.IGNORECASE, boundary=r"\b"
+        ),
+    ],
+    re.IGNORECASE,
+)
+
+LATIN_RE = re.compile(r"[A-Za-z]")
+LEADING_FILLER_RE = re.compile(r"^[一啊嗯呃额]\s*(?=[我你他她它这那今明昨])")
+FOREIGN_SCRIPT_RE = re.compile(r"[^0-9A-Za-z\u4e00-\u9fff\s，。！？、,:;.!?\-_'\"()（）【】\[\]]+")
+REPEATED_COMMA_RE = re.compile(r"[，,]{2,}")
+REPEATED_STOP_RE = re.compile(r"[。.!！？?]{2,}")
+SPACED_COMMA_RE = re.compile(r"\s*[，]\s*")
+SPACED_LETTERS_RE = re.compile(r"\b([A-Za-z])(?:\s+([A-Za-z])){1,6}\b")
+SPLIT_DIGITS_RE = re.compile(r"(?<!\d)(?:\d\s*[、,，]\s*)+\d(?!\d)")
+WHITESPACE_RE = re.compile(r"\s+")
+NON_DIGIT_RE = re.compile(r"\D")
+
+
+def normalize_tech_phrases(text):
+    # Every rule starts with a latin word boundary.
+    if not LATIN_RE.search(text):
+        return text
+    return apply_rules(text, TECH_PHRASE_RULES)
+
+
+def post_process_text(text, policy):
+    text = text.strip()
+    # Drop common Mandarin filler syllables at sentence start, e.g. "一我今天..."
+    text = LEADING_FILLER_RE.sub("", text)
+    # Keep Mandarin + English + digits and common punctuation, drop other scripts.
+    text = FOREIGN_SCRIPT_RE.sub("", text)
+    if policy == "light-normalize":
+        text = text.replace("：", "，").replace(":", "，")
+        text = text.replace("；", "，").replace(";", "，")
+        text = REPEATED_COMMA_RE.sub("，", text)
+        text = REPEATED_STOP_RE.sub(lambda m: m.group(0)[0], text)
+        text = SPACED_COMMA_RE.sub("，", text)
+
+    text = apply_rules(text, DICTATION_RULES)
 
     text = normalize_tech_phrases(text)
 
     # Merge spaced letter abbreviations and uppercase them, e.g. "g p t" -> "GPT".
-    text = re.sub(
-        r"\b([A-Za-z])(?:\s+([A-Za-z])){1,6}\b",
-        lambda m: re.sub(r"\s+", "", m.group(0)).upper(),
-        text,
-    )
+    text = SPACED_LETTERS_RE.sub(lambda m: WHITESPACE_RE.sub("", m.group(0)).upper(), text)
 
-    text = re.sub(
-        r"(?<!\d)(?:\d\s*[、,，]\s*)+\d(?!\d)",
-        lambda m: re.sub(r"\D", "", m.group(0)),
-        text,
-    )
+    text = SPLIT_DIGITS_RE.sub(lambda m: NON_DIGIT_RE.sub("", m.group(0)), text)
     if text:
         text += " "
     return text
@@ -520,6 +1289,135 @@ def _filter_model_load_logs(text):
     return out
 
 
+# Preallocated int16 capture ring; `written` counts samples since the last reset.
+class AudioRing:
+    def __init__(self, capacity):
+        self.buf = np.zeros(max(1, int(capacity)), dtype=np.int16)
+        self.written = 0
+
+    def reset(self):
+        self.written = 0
+
+    def rewind(self, keep):
+        # Move the newest `keep` samples to the front and count from there;
+        # only the writer may call this.
+        keep = min(int(keep), self.written, self.buf.shape[0])
+        if keep:
+            self.buf[:keep] = self.read(self.written - keep)
+        self.written = keep
+
+    def write(self, block):
+        cap = self.buf.shape[0]
+        n = block.shape[0]
+        if n > cap:
+            block = block[n - cap:]
+        pos = (self.written + n - block.shape[0]) % cap
+        first = min(block.shape[0], cap - pos)
+        self.buf[pos:pos + first] = block[:first]
+        if first < block.shape[0]:
+            self.buf[:block.shape[0] - first] = block[first:]
+        # Publish the count only after the samples are in place.
+        self.written += n
+
+    def read(self, start=0, end=None):
+        cap = self.buf.shape[0]
+        end = self.written if end is None else end
+        start = max(start, end - cap)
+        i = start % cap
+        n = end - start
+        if i + n <= cap:
+            return self.buf[i:i + n]
+        return np.concatenate((self.buf[i:], self.buf[:n - (cap - i)]))
+
+
+def frame_levels(audio_i16, frame_len):
+    # Per-frame power in dBFS; a partial last frame is zero-padded.
+    n = audio_i16.shape[0]
+    nf = -(-n // frame_len)
+    frames = np.zeros(nf * frame_len, dtype=np.float32)
+    frames[:n] = audio_i16
+    frames = frames.reshape(nf, frame_len)
+    power = np.einsum("ij,ij->i", frames, frames) / np.float32(frame_len * 32768.0 * 32768.0)
+    return 10.0 * np.log10(power + 1e-12)
+
+
+def speech_threshold(db, margin_db=10.0):
+    return min(max(np.percentile(db, 10) + margin_db, -50.0), -35.0)
+
+
+def speech_mask(audio_i16, frame_len, pad_frames=0, max_pause_frames=0, margin_db=10.0):
+    # Energy VAD keep mask (None keeps everything): trims edges and shortens long pauses.
+    if frame_len <= 0 or audio_i16.shape[0] < 2 * frame_len:
+        return None
+    db = frame_levels(audio_i16, frame_len)
+    nf = db.shape[0]
+    speech = db > speech_threshold(db, margin_db)
+    if not speech.any():
+        return None
+    if pad_frames > 0:
+        speech = np.convolve(speech, np.ones(2 * pad_frames + 1), mode="same") > 0
+    idx = np.flatnonzero(speech)
+    keep = np.zeros(nf, dtype=bool)
+    keep[idx[0] : idx[-1] + 1] = True
+    if max_pause_frames > 0:
+        gaps = np.flatnonzero(np.diff(np.concatenate(([0], (keep & ~speech).astype(np.int8), [0]))))
+        for start, end in zip(gaps[::2], gaps[1::2]):
+            if end - start > max_pause_frames:
+                half = max_pause_frames // 2
+                keep[start + half : end - (max_pause_frames - half)] = False
+    if keep.all():
+        return None
+    return keep
+
+
+def segment_cut(audio_i16, frame_len, min_frames, pause_frames, max_frames):
+    # Cut mid-pause between min_frames and max_frames, else at the quietest frame past max_frames.
+    nf = audio_i16.shape[0] // frame_len
+    if nf < min_frames:
+        return None
+    db = frame_levels(audio_i16[: nf * frame_len], frame_len)
+    silent = (db <= speech_threshold(db)).astype(np.int8)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], silent, [0]))))
+    for start, end in zip(edges[-2::-2], edges[-1::-2]):
+        if start < min_frames:
+            break
+        if end - start >= pause_frames and (start + end) // 2 <= max_frames:
+            return (start + end) // 2 * frame_len
+    if nf < max_frames:
+        return None
+    lo = max_frames // 2
+    return (lo + int(np.argmin(db[lo:max_frames]))) * frame_len + frame_len // 2
+
+
+def join_segments(texts):
+    out = ""
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        # Latin words need a space across the seam; CJK text does not.
+        if out and out[-1].isascii() and text[0].isascii() and text[0].isalnum():
+            out += " "
+        out += text
+    return out
+
+
+def mask_frames(x, keep, frame_len=1):
+    # Rows of `x` kept by a per-frame mask; a view when they are contiguous.
+    if frame_len > 1:
+        keep = np.repeat(keep, frame_len)
+    n = x.shape[0]
+    if keep.shape[0] < n:
+        keep = np.concatenate((keep, np.full(n - keep.shape[0], keep[-1])))
+    keep = keep[:n]
+    idx = np.flatnonzero(keep)
+    if idx.size == 0:
+        return x[:0]
+    if idx[-1] - idx[0] + 1 == idx.size:
+        return x[idx[0] : idx[-1] + 1]
+    return x[keep]
+
+
 class App:
     def __init__(self, cfg):
         self.cfg = cfg
@@ -527,6 +1425,14 @@ class App:
         self.sample_rate = int(s.get("sample_rate", 16000))
         self.chunk_ms = int(s.get("chunk_ms", 320))
         self.max_utterance_ms = int(s.get("max_utterance_ms", 12000))
+        self.warm_stream = to_bool(s.get("warm_stream", True), True)
+        self.preroll_ms = max(0, int(s.get("preroll_ms", 300)))
+        self.long_form = to_bool(s.get("long_form", False), False)
+        self.segment_max_ms = max(3000, int(s.get("segment_max_ms", 10000)))
+        self.long_form_max_ms = int(s.get("long_form_max_ms", 600000))
+        self.vad_trim = to_bool(s.get("vad_trim", True), True)
+        self.vad_pad_ms = max(0, int(s.get("vad_pad_ms", 200)))
+        self.vad_max_pause_ms = max(0, int(s.get("vad_max_pause_ms", 0)))
         self.punctuation_policy = s.get("punctuation_policy", "light-normalize")
         self.interaction_mode = str(s.get("interaction_mode", "hold-to-talk")).strip().lower()
         if self.interaction_mode not in {"hold-to-talk", "toggle"}:
@@ -541,6 +1447,7 @@ class App:
         self.sound_on_stop = to_bool(sound_cfg.get("on_stop", True), True)
         self.sound_on_done = to_bool(sound_cfg.get("on_done", False), False)
         self.sound_theme = str(sound_cfg.get("theme", "wispr-like")).strip().lower()
+        self.earcons = EarconPlayer(self.sound_theme) if self.sound_enable else None
 
         self.base_zh_spec = expand_pathspec(
             os.getenv("VOICE_INPUT_BASE_ZH_RULES", os.path.join("lexicons", "base_zh.rules"))
@@ -575,17 +1482,40 @@ class App:
         self.tech_words_spec = expand_pathspec(
             os.getenv("VOICE_INPUT_TECH_WORDS", os.path.join("lexicons", "tech_en.words"))
         )
-        self.base_zh_rules = load_replacements_sources(self.base_zh_spec)
-        self.base_en_rules = load_replacements_sources(self.base_en_spec)
-        self.user_correction_rules = load_replacements_sources(self.user_corrections_spec)
-        self.auto_correction_rules = load_replacements_sources(self.auto_rules_spec)
-        self.tech_words = load_words_sources(self.tech_words_spec)
+        # Applied in this order; only the zh layer is case-sensitive.
+        self._replacement_sources = [
+            CachedSource(self.base_zh_spec, load_replacements_sources, ReplacementMatcher),
+            CachedSource(
+                self.base_en_spec,
+                load_replacements_sources,
+                lambda rules: ReplacementMatcher(rules, ignore_case=True),
+            ),
+            CachedSource(
+                self.user_corrections_spec,
+                load_replacements_sources,
+                lambda rules: ReplacementMatcher(rules, ignore_case=True),
+            ),
+            CachedSource(
+                self.auto_rules_spec,
+                load_replacements_sources,
+                lambda rules: ReplacementMatcher(rules, ignore_case=True),
+            ),
+        ]
+        self._tech_words_source = CachedSource(
+            self.tech_words_spec, load_words_sources, TechFuzzyIndex
+        )
+        self.tech_words = []
+        self._hotword_index = None
+        self.reload_replacements()
+        self.reload_tech_words()
         self.history_path = os.path.expanduser(
             os.getenv(
                 "VOICE_INPUT_HISTORY_PATH",
                 "~/.local/state/voice-input-funasr-nano/history.jsonl",
             )
         )
+        self.persistence = PersistenceWorker(self.history_path, self.auto_learning_state_path)
+        self._injector = create_injector(str(cfg.get("inject_backend", "auto")).strip().lower())
 
         self.required_keys = set()
         for raw in cfg["hotkey"].split("+"):
@@ -599,11 +1529,31 @@ class App:
         self.state = "idle"
 
         self._recording = False
-        self._q = queue.Queue()
-        self._frames = []
+        self._stop_recording = threading.Event()
+        # Sized for the longest utterance plus the blocks that can land while
+        # record_loop notices the cap and closes the stream.
+        # Long-form mode decodes closed segments while recording, so the ring
+        # only has to cover the open segment plus decoding lag.
+        capture_ms = 3 * self.segment_max_ms if self.long_form else self.max_utterance_ms
+        self._ring = AudioRing(
+            self.sample_rate * (capture_ms + self.preroll_ms + 4 * self.chunk_ms) // 1000
+        )
+        self._segments = []
+        self._segment_start = 0
+        self._segment_thread = None
+        self._capture_full = False
+        self._rewind_pending = False
+        self._ring_gap = False
+        self._warm_stream = None
+        if self.warm_stream:
+            try:
+                self._warm_stream = self._open_input_stream()
+                self._warm_stream.start()
+            except Exception as e:
+                self._warm_stream = None
+                print(f"warm input stream unavailable, opening per utterance: {e}", flush=True)
         self._target_window = None
         self._lock = threading.Lock()
-        self._status_notify_id = None
 
         self.model_id = str(
             s.get("model", "~/.cache/huggingface/FunAudioLLM-Fun-ASR-Nano-2512")
@@ -612,6 +1562,8 @@ class App:
         self.dtype = str(s.get("dtype", "float32")).strip()
         self.hotword_boost_enable = to_bool(s.get("hotword_boost_enable", True), True)
         self.hotword_boost_weight = float(s.get("hotword_boost_weight", 0.6))
+        self.hotword_top_k = int(s.get("hotword_top_k", 32))
+        self.hotword_min_score = float(s.get("hotword_min_score", 0.5))
         self.learning_min_hits = int(s.get("learning_min_hits", 2))
         self.auto_learn_enable = to_bool(s.get("auto_learn_enable", True), True)
         self.warmup_on_start = to_bool(s.get("warmup_on_start", True), True)
@@ -619,9 +1571,18 @@ class App:
         self.torch_num_threads = int(s.get("torch_num_threads", 8))
         self.language = s.get("language", "中文")
         self.itn = to_bool(s.get("itn", True), True)
+        self.streaming_fbank = to_bool(s.get("streaming_fbank", True), True)
+        self.speculative_encoder = to_bool(s.get("speculative_encoder", False), False)
+        self.speculative_window_ms = int(s.get("speculative_window_ms", 1920))
+        self.speculative_context_ms = int(s.get("speculative_context_ms", 600))
+        self.prefix_cache = to_bool(s.get("prefix_cache", True), True)
 
+        self._nano_module = None
         self._nano_model = None
         self._nano_kwargs = None
+        self._fbank_stream = None
+        self._spec_encoder = None
+        self._spec_thread = None
 
     def _patch_whisper_asset_fallbacks(self):
         # Some FunASR wheels miss whisper_lib/assets in site-packages.
@@ -772,6 +1733,15 @@ class App:
                 f"auto-download model failed from {MODEL_INFO_URL}: {e}"
             ) from e
 
+    def reload_replacements(self):
+        self.replacement_layers = [src.get() for src in self._replacement_sources]
+
+    def reload_tech_words(self):
+        self.tech_fuzzy = self._tech_words_source.get()
+        if self._tech_words_source.data is not self.tech_words:
+            self.tech_words = self._tech_words_source.data
+            self._hotword_index = None
+
     def run(self):
         if self.warmup_on_start:
             if self.warmup_blocking_start:
@@ -831,66 +1801,24 @@ class App:
         if event == "done" and not self.sound_on_done:
             return
 
-        # Short non-blocking earcons, inspired by voice dictation UI cues.
-        if self.sound_theme == "wispr-like":
-            mapping = {
-                "start": (987.77, 0.050),
-                "stop": (659.25, 0.060),
-                "done": (523.25, 0.050),
-            }
-        else:
-            mapping = {
-                "start": (880.0, 0.050),
-                "stop": (660.0, 0.060),
-                "done": (520.0, 0.050),
-            }
-
-        tone = mapping.get(event)
-        if not tone:
-            return
-        freq, dur = tone
-        try:
-            sr = 24000
-            n = max(1, int(sr * dur))
-            t = np.arange(n, dtype=np.float32) / np.float32(sr)
-            env = np.linspace(1.0, 0.75, n, dtype=np.float32)
-            wave = (0.12 * np.sin(2.0 * np.pi * np.float32(freq) * t) * env).astype(np.float32)
-            sd.play(wave, sr, blocking=False)
-        except Exception:
-            return
+        self.earcons.play(event)
 
     def emit_feedback(self, event):
         if event == "start":
             if self.recording_notify:
-                self._status_notify_id = notify(
-                    "Recording...",
-                    expire_ms=10000,
-                    replace_id=self._status_notify_id,
-                )
+                notify("Recording...", expire_ms=10000, slot="status")
             self.play_feedback_sound("start")
             return
         if event == "stop":
             if self.thinking_notify:
-                self._status_notify_id = notify(
-                    "Thinking...",
-                    expire_ms=10000,
-                    replace_id=self._status_notify_id,
-                )
+                notify("Thinking...", expire_ms=10000, slot="status")
             self.play_feedback_sound("stop")
             return
         if event == "done":
             if self.done_notify:
-                self._status_notify_id = notify(
-                    "Done",
-                    expire_ms=400,
-                    replace_id=self._status_notify_id,
-                )
-            elif self._status_notify_id is not None:
-                self._status_notify_id = notify(
-                    " ",
-                    expire_ms=1,
-                    replace_id=self._status_notify_id,
-                )
+                notify("Done", expire_ms=400, slot="status")
+            else:
+                NOTIFIER.close("status")
             self.play_feedback_sound("done")
             return
 
@@ -906,11 +1834,64 @@ class App:
             self._target_window = wid or None
         except Exception:
             self._target_window = None
+        if self._target_window:
+            # Classify the window while the user is still speaking.
+            threading.Thread(
+                target=get_window_class, args=(self._target_window,), daemon=True
+            ).start()
+
+    def _vad_mask(self, audio_i16, frame_len):
+        if not self.vad_trim:
+            return None
+        per_ms = 1000 * frame_len
+        return speech_mask(
+            audio_i16,
+            frame_len,
+            pad_frames=-(-self.vad_pad_ms * self.sample_rate // per_ms),
+            max_pause_frames=self.vad_max_pause_ms * self.sample_rate // per_ms,
+        )
+
+    def _open_input_stream(self):
+        return sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype="int16",
+            blocksize=max(1, int(self.sample_rate * self.chunk_ms / 1000)),
+            callback=self._audio_cb,
+        )
+
+    def _arm_capture(self):
+        if self._warm_stream is not None:
+            # The callback keeps the pre-roll and restarts the count on its next block.
+            self._rewind_pending = True
+        else:
+            self._ring.reset()
 
     def _audio_cb(self, indata, frames, _time_info, status):
-        if status:
+        if self._rewind_pending:
+            if self._ring_gap:
+                # Blocks were dropped since the last write; a pre-roll would span the hole.
+                self._ring.reset()
+            else:
+                self._ring.rewind(self.sample_rate * self.preroll_ms // 1000)
+            self._ring_gap = False
+            self._rewind_pending = False
+        if status or (self.state == "thinking" and self._warm_stream is not None):
+            # Keep the finished utterance intact while it is being decoded.
+            self._ring_gap = True
             return
-        self._q.put(indata.copy())
+        if self._segment_thread is not None and (
+            self._capture_full
+            or self._ring.written + frames - self._segment_start > self._ring.buf.shape[0]
+        ):
+            # Long-form decoding fell behind; stop rather than overwrite undecoded audio.
+            self._capture_full = True
+            self._ring_gap = True
+            return
+        if self._ring_gap and self.state != "recording":
+            self._ring.reset()
+        self._ring_gap = False
+        self._ring.write(indata[:, 0])
 
     def toggle_recording(self):
         with self._lock:
@@ -918,12 +1899,16 @@ class App:
                 return
             if self.state == "recording":
                 self._recording = False
+                self._stop_recording.set()
                 self.state = "thinking"
                 self.emit_feedback("stop")
                 return
             self._recording = True
+            self._stop_recording.clear()
             self.state = "recording"
-            self._frames = []
+            self._arm_capture()
+            self._fbank_stream = self._new_fbank_stream()
+            self._start_speculative_encoder()
             self.save_active_window()
             self.emit_feedback("start")
             threading.Thread(target=self.record_loop, daemon=True).start()
@@ -933,8 +1918,11 @@ class App:
             if self.state != "idle":
                 return
             self._recording = True
+            self._stop_recording.clear()
             self.state = "recording"
-            self._frames = []
+            self._arm_capture()
+            self._fbank_stream = self._new_fbank_stream()
+            self._start_speculative_encoder()
             self.save_active_window()
             self.emit_feedback("start")
             threading.Thread(target=self.record_loop, daemon=True).start()
@@ -944,40 +1932,143 @@ class App:
             if self.state != "recording":
                 return
             self._recording = False
+            self._stop_recording.set()
             self.state = "thinking"
             self.emit_feedback("stop")
 
+    def _capture_stream(self):
+        warm = self._warm_stream
+        if warm is not None and not warm.active:
+            print("warm input stream stopped, opening per utterance", flush=True)
+            self._warm_stream = None
+            self._rewind_pending = False
+            self._ring.reset()
+            try:
+                warm.close()
+            except Exception:
+                pass
+        if self._warm_stream is not None:
+            return nullcontext()
+        return self._open_input_stream()
+
     def record_loop(self):
-        blocksize = max(1, int(self.sample_rate * self.chunk_ms / 1000))
-        started = time.time()
+        limit_ms = self.long_form_max_ms if self.long_form else self.max_utterance_ms
+        deadline = time.monotonic() + limit_ms / 1000.0
+        self._segments = []
+        self._segment_start = 0
+        self._segment_thread = None
+        self._capture_full = False
+        if self.long_form:
+            self._segment_thread = threading.Thread(target=self._segment_loop, daemon=True)
+            self._segment_thread.start()
+        fed = 0
         try:
-            with sd.InputStream(
-                samplerate=self.sample_rate,
-                channels=1,
-                dtype="int16",
-                blocksize=blocksize,
-                callback=self._audio_cb,
-            ):
+            with self._capture_stream():
                 while True:
-                    if not self._recording:
+                    remaining = deadline - time.monotonic()
+                    stopped = self._stop_recording.wait(
+                        min(self.chunk_ms / 1000.0, max(0.0, remaining))
+                    )
+                    fed = self._feed_fbank_stream(fed)
+                    if stopped:
                         break
-                    if (time.time() - started) * 1000 > self.max_utterance_ms:
+                    if remaining <= 0:
                         self._recording = False
                         if self.state == "recording":
                             self.state = "thinking"
                             self.emit_feedback("stop")
                         break
-                    try:
-                        chunk = self._q.get(timeout=0.1).reshape(-1)
-                    except queue.Empty:
-                        continue
-                    self._frames.append(chunk)
         except Exception as e:
             print(f"audio error: {e}")
             notify(f"audio error: {e}")
             return
+        # Blocks delivered while the stream was closing.
+        self._feed_fbank_stream(fed)
         self.finish_transcription()
 
+    def _new_fbank_stream(self):
+        # Features can only be computed during capture once the model (and its
+        # frontend) is loaded; otherwise extraction happens after release.
+        if not self.streaming_fbank or self.long_form or self._nano_model is None:
+            return None
+        frontend = (self._nano_kwargs or {}).get("frontend")
+        stream_cls = getattr(self._nano_module, "StreamingFbank", None)
+        if frontend is None or stream_cls is None or not stream_cls.supports(frontend):
+            return None
+        if int(frontend.fs) != self.sample_rate:
+            return None
+        return stream_cls(frontend)
+
+    def _feed_fbank_stream(self, fed):
+        if self._rewind_pending:
+            return fed
+        written = self._ring.written
+        stream = self._fbank_stream
+        if stream is None or written <= fed:
+            return written
+        try:
+            stream.accept(self._ring.read(fed, written).astype(np.float32) / 32768.0)
+        except Exception as e:
+            print(f"streaming fbank disabled for this utterance: {e}", flush=True)
+            self._fbank_stream = None
+        return written
+
+    def _start_speculative_encoder(self):
+        self._spec_encoder = None
+        self._spec_thread = None
+        if not self.speculative_encoder or self._fbank_stream is None:
+            return
+        encoder_cls = getattr(self._nano_module, "SpeculativeEncoder", None)
+        if encoder_cls is None:
+            return
+        frontend = self._fbank_stream.frontend
+        row_ms = frontend.frame_shift * frontend.lfr_n
+        spec = encoder_cls(
+            self._nano_model,
+            self._fbank_stream,
+            window_rows=max(1, self.speculative_window_ms // row_ms),
+            context_rows=max(0, self.speculative_context_ms // row_ms),
+        )
+        self._spec_encoder = spec
+        self._spec_thread = threading.Thread(
+            target=self._speculative_encode_loop, args=(spec,), daemon=True
+        )
+        self._spec_thread.start()
+
+    def _speculative_encode_loop(self, spec):
+        while self._recording and self._spec_encoder is spec:
+            try:
+                progressed = spec.step()
+            except Exception as e:
+                print(f"speculative encoder disabled for this utterance: {e}", flush=True)
+                spec.failed = True
+                return
+            if not progressed:
+                time.sleep(0.05)
+
+    def _finish_speculative_encoder(self, fbank, keep=None):
+        spec, self._spec_encoder = self._spec_encoder, None
+        worker, self._spec_thread = self._spec_thread, None
+        if worker is not None:
+            worker.join()
+        if spec is None or fbank is None:
+            return None
+        try:
+            if keep is None:
+                return spec.finalize(fbank)
+            # Committed windows are kept; only the tail up to the last speech
+            # row still needs encoding, then the mask drops silent rows.
+            cut = max(int(np.flatnonzero(keep)[-1]) + 1, spec.committed)
+            result = spec.finalize(fbank[:cut])
+            if result is None:
+                return None
+            encoder_out = mask_frames(result[0][0], keep)[None, :, :]
+            encoder_out_lens = result[1].new_tensor([encoder_out.shape[1]])
+            return encoder_out, encoder_out_lens
+        except Exception as e:
+            print(f"speculative encoder finalize failed: {e}", flush=True)
+            return None
+
     def ensure_model(self):
         if self._nano_model is not None:
             return
@@ -1038,6 +2129,7 @@ class App:
         for ln in _filter_model_load_logs("\n".join([buf_out.getvalue(), buf_err.getvalue()])):
             print(ln, flush=True)
         model.eval()
+        self._nano_module = module
         self._nano_model = model
         self._nano_kwargs = kwargs
 
@@ -1057,20 +2149,54 @@ class App:
         self._nano_kwargs = None
         self.ensure_model()
 
-    def transcribe_with_funasr(self, wav_path, retried_after_cuda_fallback=False):
+    def _select_hotwords(self, data, infer_kwargs):
+        # hotword_top_k <= 0 keeps the old behaviour of prompting the whole lexicon.
+        if self.hotword_top_k <= 0:
+            return list(self.tech_words)
+        if getattr(self._nano_model, "ctc_decoder", None) is None:
+            return list(self.tech_words[: self.hotword_top_k])
+        if self._hotword_index is None:
+            self._hotword_index = HotwordIndex(self.tech_words)
+        encoder_out, encoder_out_lens, ctc_text, fbank = self._nano_model.first_pass(
+            data, **infer_kwargs
+        )
+        # Reuse the first-pass features and encoder output for the LLM pass.
+        if fbank is not None:
+            infer_kwargs["fbank"] = fbank
+        infer_kwargs["audio_embedding"] = encoder_out
+        infer_kwargs["audio_embedding_lens"] = encoder_out_lens
+        return self._hotword_index.select(ctc_text, self.hotword_top_k, self.hotword_min_score)
+
+    def transcribe_with_funasr(
+        self, audio, fbank=None, audio_embedding=None, retried_after_cuda_fallback=False
+    ):
+        # audio is either a file path (warmup example) or a float32 mono numpy
+        # buffer captured in-process, which is handed over as a tensor so the
+        # model's "!!" ChatML branch skips the WAV encode/decode round-trip.
         self.ensure_model()
         infer_kwargs = dict(self._nano_kwargs or {})
-        if self.hotword_boost_enable and self.tech_words:
-            infer_kwargs["hotword"] = " ".join(self.tech_words)
-            if "hotword_weight" in infer_kwargs:
-                infer_kwargs["hotword_weight"] = self.hotword_boost_weight
+        data = audio
+        if isinstance(audio, np.ndarray):
+            import torch
+
+            data = torch.from_numpy(audio)
+            infer_kwargs["audio_fs"] = self.sample_rate
+        if fbank is not None:
+            infer_kwargs["fbank"] = fbank
+        if audio_embedding is not None:
+            infer_kwargs["audio_embedding"], infer_kwargs["audio_embedding_lens"] = audio_embedding
         if self.dtype and "dtype" in infer_kwargs:
             infer_kwargs["dtype"] = self.dtype
         infer_kwargs.setdefault("language", self.language)
         infer_kwargs.setdefault("itn", self.itn)
+        infer_kwargs["prefix_cache"] = self.prefix_cache
 
         try:
-            res = self._nano_model.inference(data_in=[wav_path], **infer_kwargs)
+            if self.hotword_boost_enable and self.tech_words:
+                infer_kwargs["hotwords"] = self._select_hotwords(data, infer_kwargs)
+                if "hotword_weight" in infer_kwargs:
+                    infer_kwargs["hotword_weight"] = self.hotword_boost_weight
+            res = self._nano_model.inference(data_in=[data], **infer_kwargs)
         except Exception as e:
             if (
                 str(self.device).startswith("cuda")
@@ -1084,7 +2210,7 @@ class App:
                 notify("FunASR CUDA failed, switching to CPU")
                 self._reload_model_on_cpu()
                 return self.transcribe_with_funasr(
-                    wav_path, retried_after_cuda_fallback=True
+                    audio, fbank=fbank, retried_after_cuda_fallback=True
                 )
             raise RuntimeError(f"nano inference failed: {e}") from e
 
@@ -1096,65 +2222,137 @@ class App:
             )
         return text
 
+    def _segment_loop(self):
+        # Long-form mode: close a segment at a pause (or by segment_max_ms) and
+        # decode it while recording continues.
+        frame_len = self.sample_rate * 30 // 1000
+        frame_ms = 30
+        warned = False
+        while self._recording:
+            time.sleep(self.chunk_ms / 1000.0)
+            if self._rewind_pending or not self._recording:
+                continue
+            if self._capture_full and not warned:
+                warned = True
+                print("long-form decoding fell behind capture; later audio was dropped", flush=True)
+                notify("Decoding fell behind; later audio was dropped")
+            try:
+                written = self._ring.written
+                audio = self._ring.read(self._segment_start, written)
+                cut = segment_cut(
+                    audio,
+                    frame_len,
+                    min_frames=2000 // frame_ms,
+                    pause_frames=300 // frame_ms,
+                    max_frames=self.segment_max_ms // frame_ms,
+                )
+                if cut is None:
+                    continue
+                segment = np.array(audio[:cut])
+                self._segment_start = written - audio.shape[0] + cut
+                self._segments.append(self._decode_segment(segment))
+            except Exception as e:
+                print(f"long-form segmenting failed: {e}", flush=True)
+
+    def _finish_segments(self):
+        worker, self._segment_thread = self._segment_thread, None
+        if worker is not None:
+            worker.join()
+        tail = self._ring.read(self._segment_start)
+        if tail.size:
+            self._segments.append(self._decode_segment(tail))
+        return join_segments(self._segments)
+
+    def _decode_segment(self, audio_i16):
+        frame_len = self.sample_rate * 30 // 1000
+        keep = self._vad_mask(audio_i16, frame_len)
+        if keep is not None:
+            audio_i16 = mask_frames(audio_i16, keep, frame_len)
+        try:
+            return self.transcribe_with_funasr(audio_i16.astype(np.float32) / np.float32(32768.0))
+        except Exception as e:
+            print(f"segment decode failed: {e}", flush=True)
+            return ""
+
+    def _decode_capture(self):
+        audio_i16 = self._ring.read()
+        fbank = None
+        stream, self._fbank_stream = self._fbank_stream, None
+        if stream is not None and stream.num_samples == audio_i16.size:
+            try:
+                fbank = stream.finalize()
+            except Exception as e:
+                print(f"streaming fbank finalize failed: {e}", flush=True)
+        # Drop leading/trailing silence (and long pauses) before the encoder.
+        # With streaming features the VAD frame is one LFR row, so the same mask
+        # selects audio samples, feature rows and speculative encoder rows.
+        if fbank is not None:
+            frame_len = stream.frame_shift * stream.frontend.lfr_n
+        else:
+            frame_len = self.sample_rate * 30 // 1000
+        keep = self._vad_mask(audio_i16, frame_len)
+        audio_embedding = self._finish_speculative_encoder(fbank, keep)
+        if keep is not None:
+            audio_i16 = mask_frames(audio_i16, keep, frame_len)
+            if fbank is not None:
+                fbank = mask_frames(fbank, keep)
+        audio_f32 = audio_i16.astype(np.float32)
+        audio_f32 *= np.float32(1.0 / 32768.0)
+        return self.transcribe_with_funasr(
+            audio_f32, fbank=fbank, audio_embedding=audio_embedding
+        )
+
     def finish_transcription(self):
-        if not self._frames:
+        if self._rewind_pending or not self._ring.written:
             self.state = "idle"
             return
-        # Hot-reload user-updated correction/lexicon files without restarting service.
-        self.base_zh_rules = load_replacements_sources(self.base_zh_spec)
-        self.base_en_rules = load_replacements_sources(self.base_en_spec)
-        self.user_correction_rules = load_replacements_sources(self.user_corrections_spec)
-        self.auto_correction_rules = load_replacements_sources(self.auto_rules_spec)
-        self.tech_words = load_words_sources(self.tech_words_spec)
-
-        audio_i16 = np.concatenate(self._frames).astype(np.int16)
-        audio_f32 = (audio_i16.astype(np.float32) / 32768.0).reshape(-1, 1)
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-            wav_path = tmp.name
+        t_start = time.perf_counter()
+        # Hot-reload user-updated correction/lexicon files without restarting service;
+        # only files whose mtime or size changed are reparsed.
+        self.reload_replacements()
+        self.reload_tech_words()
+
         try:
-            sf.write(wav_path, audio_f32, self.sample_rate, subtype="PCM_16", format="WAV")
-            raw_text = self.transcribe_with_funasr(wav_path)
+            if self.long_form:
+                raw_text = self._finish_segments()
+            else:
+                raw_text = self._decode_capture()
             pre_text = post_process_text(raw_text, self.punctuation_policy)
             text = pre_text
             # Three-layer lexicon correction pipeline: base_zh -> base_en -> tech_en
-            text = apply_replacements(text, self.base_zh_rules, ignore_case=False)
-            text = apply_replacements(text, self.base_en_rules, ignore_case=True)
-            text = apply_replacements(text, self.user_correction_rules, ignore_case=True)
-            text = apply_replacements(text, self.auto_correction_rules, ignore_case=True)
-            text = apply_tech_fuzzy(text, self.tech_words)
-            learned = []
+            for matcher in self.replacement_layers:
+                text = matcher.apply(text)
+            text = apply_tech_fuzzy(text, self.tech_fuzzy)
+            # Paste first; history and learning only need the texts and run on
+            # the persistence worker afterwards.
+            if text:
+                self.inject_text(text)
+            paste_ms = int((time.perf_counter() - t_start) * 1000)
+            self.emit_feedback("done")
+            learn = None
             if self.auto_learn_enable:
-                learned = auto_learn_corrections(
+                learn = (
                     pre_text,
                     text,
                     self.tech_words,
-                    self.auto_learning_state_path,
                     self.auto_rules_write_path,
-                    min_hits=self.learning_min_hits,
+                    self.learning_min_hits,
                 )
-            append_jsonl(
-                self.history_path,
+            self.persistence.record(
                 {
                     "ts": datetime.now(timezone.utc).isoformat(),
                     "raw_text": raw_text,
                     "final_text": text.strip(),
-                    "auto_learned": learned,
+                    "auto_learned": [],
+                    "paste_ms": paste_ms,
                 },
+                learn,
             )
-            if text:
-                self.inject_text(text)
-                self.emit_feedback("done")
-            else:
-                self.emit_feedback("done")
         except Exception as e:
             print(f"ASR error: {e}", flush=True)
             notify(f"ASR error: {e}")
         finally:
             self.state = "idle"
-            try:
-                os.remove(wav_path)
-            except Exception:
-                pass
 
     def inject_text(self, text):
         wid = self._target_window
@@ -1162,6 +2360,15 @@ class App:
             return
         is_term = is_terminal_window(wid)
         is_kitty = is_kitty_window(wid)
+        if self._injector is not None:
+            keys = ["ctrl+shift+v"] if is_term else ["ctrl+v"]
+            if is_term and is_kitty:
+                keys += ["Left", "Right"]
+            try:
+                self._injector.paste(wid, text, keys)
+                return
+            except Exception as e:
+                print(f"native paste failed, using xdotool: {e}", flush=True)
         try:
             p1 = subprocess.Popen(["xclip", "-selection", "clipboard"], stdin=subprocess.PIPE)
             p1.communicate(input=text.encode("utf-8"), timeout=2)
@@ -1,15 +1,19 @@
+import copy
 import logging
 import os
 import random
 import re
 import string
+import threading
 import time
 import traceback
 from typing import Union
 
 import torch
 import torch.nn as nn
+import torchaudio.compliance.kaldi as kaldi
 
+from funasr.frontends.wav_frontend import apply_cmvn, apply_lfr
 from funasr.metrics.compute_acc import compute_accuracy
 from funasr.register import tables
 from funasr.train_utils.device_funcs import force_gatherable, to_device
@@ -17,12 +21,165 @@ from funasr.utils.datadir_writer import DatadirWriter
 from funasr.utils.load_utils import extract_fbank, load_audio_text_image_video
 from transformers import AutoConfig, AutoModelForCausalLM
 
+try:
+    from transformers import DynamicCache
+except ImportError:  # transformers without the Cache API
+    DynamicCache = None
+
 from ctc import CTC
 from tools.utils import forced_align
 
 dtype_map = {"bf16": torch.bfloat16, "fp16": torch.float16, "fp32": torch.float32}
 
 
+# Incremental fbank; LFR and CMVN depend on the tail, so they run at finalize.
+class StreamingFbank:
+    def __init__(self, frontend):
+        self.frontend = frontend
+        self.fs = frontend.fs
+        self.frame_shift = int(frontend.fs * frontend.frame_shift / 1000)
+        self.frame_length = int(frontend.fs * frontend.frame_length / 1000)
+        self.reset()
+
+    @staticmethod
+    def supports(frontend):
+        return all(
+            hasattr(frontend, attr)
+            for attr in ("fs", "n_mels", "frame_length", "frame_shift", "lfr_m", "lfr_n")
+        ) and getattr(frontend, "snip_edges", True)
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._pending = torch.zeros(0, dtype=torch.float32)
+        self._chunks = []
+        self.num_frames = 0
+        self.num_samples = 0
+
+    def _fbank(self, waveform):
+        if getattr(self.frontend, "upsacle_samples", True):
+            waveform = waveform * (1 << 15)
+        return kaldi.fbank(
+            waveform.unsqueeze(0),
+            num_mel_bins=self.frontend.n_mels,
+            frame_length=self.frontend.frame_length,
+            frame_shift=self.frontend.frame_shift,
+            dither=getattr(self.frontend, "dither", 1.0),
+            energy_floor=0.0,
+            window_type=getattr(self.frontend, "window", "hamming"),
+            sample_frequency=self.fs,
+            snip_edges=True,
+        )
+
+    def accept(self, samples):
+        # float32 mono samples in [-1, 1]
+        x = torch.as_tensor(samples, dtype=torch.float32).reshape(-1)
+        buf = torch.cat([self._pending, x]) if self._pending.numel() else x
+        mat = None
+        n = 0
+        if buf.numel() >= self.frame_length:
+            n = (buf.numel() - self.frame_length) // self.frame_shift + 1
+            used = (n - 1) * self.frame_shift + self.frame_length
+            mat = self._fbank(buf[:used])
+        with self._lock:
+            self.num_samples += x.numel()
+            if mat is not None:
+                self._chunks.append(mat)
+                self.num_frames += n
+                self._pending = buf[n * self.frame_shift :].clone()
+            else:
+                self._pending = buf
+
+    def fbank(self):
+        with self._lock:
+            if not self._chunks:
+                return None
+            if len(self._chunks) > 1:
+                self._chunks = [torch.cat(self._chunks, dim=0)]
+            return self._chunks[0]
+
+    def _features(self, mat):
+        mat = mat.clone()
+        if self.frontend.lfr_m != 1 or self.frontend.lfr_n != 1:
+            mat = apply_lfr(mat, self.frontend.lfr_m, self.frontend.lfr_n)
+        if getattr(self.frontend, "cmvn", None) is not None:
+            mat = apply_cmvn(mat, self.frontend.cmvn)
+        return mat.to(torch.float32)
+
+    def stable_features(self):
+        # rows no future audio can change (no tail padding)
+        mat = self.fbank()
+        if mat is None:
+            return None
+        m, n = self.frontend.lfr_m, self.frontend.lfr_n
+        padded = mat.shape[0] + (m - 1) // 2
+        if padded < m:
+            return None
+        return self._features(mat)[: (padded - m) // n + 1]
+
+    def finalize(self):
+        # LFR+CMVN features [T, D] for everything fed so far, or None
+        mat = self.fbank()
+        if mat is None:
+            return None
+        return self._features(mat)
+
+
+# Encode windows with context on both sides while recording and keep only their centres.
+class SpeculativeEncoder:
+    def __init__(self, model, fbank_stream, window_rows=32, context_rows=10):
+        self.model = model
+        self.fbank_stream = fbank_stream
+        self.window_rows = max(1, int(window_rows))
+        self.context_rows = max(0, int(context_rows))
+        self.committed = 0
+        self.failed = False
+        self._outs = []
+
+    def _encode(self, feats):
+        device = next(self.model.parameters()).device
+        speech = feats[None, :, :].to(device)
+        speech_lengths = torch.tensor([feats.shape[0]], dtype=torch.int32, device=device)
+        with torch.no_grad():
+            encoder_out, _ = self.model.encode(speech, speech_lengths)
+        if encoder_out.shape[1] != feats.shape[0]:
+            # Encoder subsamples; row-aligned stitching is not possible.
+            self.failed = True
+            return None
+        return encoder_out[0]
+
+    def step(self):
+        if self.failed:
+            return False
+        feats = self.fbank_stream.stable_features()
+        start = self.committed
+        end = start + self.window_rows
+        if feats is None or feats.shape[0] < end + self.context_rows:
+            return False
+        left = max(0, start - self.context_rows)
+        out = self._encode(feats[left : end + self.context_rows])
+        if out is None:
+            return False
+        self._outs.append(out[start - left : end - left])
+        self.committed = end
+        return True
+
+    def finalize(self, feats):
+        if self.failed or not self._outs or feats is None or feats.shape[0] < self.committed:
+            return None
+        outs = list(self._outs)
+        if feats.shape[0] > self.committed:
+            left = max(0, self.committed - self.context_rows)
+            out = self._encode(feats[left:])
+            if out is None:
+                return None
+            outs.append(out[self.committed - left :])
+        encoder_out = torch.cat(outs, dim=0)[None, :, :]
+        encoder_out_lens = torch.tensor(
+            [encoder_out.shape[1]], dtype=torch.int32, device=encoder_out.device
+        )
+        return encoder_out, encoder_out_lens
+
+
 @tables.register("model_classes", "FunASRNano")
 class FunASRNano(nn.Module):
     def __init__(
@@ -155,6 +312,9 @@ class FunASRNano(nn.Module):
             self.error_calculator = None
 
         self.length_normalized_loss = length_normalized_loss
+        # KV cache of the ChatML prefix before the audio span, keyed by its token ids
+        self.prefix_cache_size = kwargs.get("prefix_cache_size", 4)
+        self._prefix_cache = {}
         rank = int(os.environ.get("RANK", 0))
         logging.info(f"rank: {rank}, model is builded.")
 
@@ -375,22 +535,31 @@ class FunASRNano(nn.Module):
                         sub_str = sub_str[1:]
                         if sub_str.startswith("!"):  # !!: audio sample point
                             sub_str = audio
-                        try:
-                            time1 = time.perf_counter()
-                            data_src = load_audio_text_image_video(
-                                sub_str, fs=frontend.fs, **kwargs
-                            )
+                        fbank_in = kwargs.get("fbank", None)
+                        if fbank_in is not None:
+                            # features already extracted incrementally during capture
                             time2 = time.perf_counter()
-                            meta_data["load_data"] = f"{time2 - time1:0.3f}"
-                        except Exception as e:
-                            logging.error(f"Loading wav failed! {str(e)}, {traceback.format_exc()}")
-
-                        speech, speech_lengths = extract_fbank(
-                            data_src,
-                            data_type=kwargs.get("data_type", "sound"),
-                            frontend=frontend,
-                            is_final=True,
-                        )  # speech: [b, T, d]
+                            speech = fbank_in[None, :, :]
+                            speech_lengths = torch.tensor([fbank_in.shape[0]], dtype=torch.int32)
+                        else:
+                            try:
+                                time1 = time.perf_counter()
+                                data_src = load_audio_text_image_video(
+                                    sub_str, fs=frontend.fs, **kwargs
+                                )
+                                time2 = time.perf_counter()
+                                meta_data["load_data"] = f"{time2 - time1:0.3f}"
+                            except Exception as e:
+                                logging.error(
+                                    f"Loading wav failed! {str(e)}, {traceback.format_exc()}"
+                                )
+
+                            speech, speech_lengths = extract_fbank(
+                                data_src,
+                                data_type=kwargs.get("data_type", "sound"),
+                                frontend=frontend,
+                                is_final=True,
+                            )  # speech: [b, T, d]
 
                         time3 = time.perf_counter()
                         meta_data["extract_feat"] = f"{time3 - time2:0.3f}"
@@ -458,6 +627,61 @@ class FunASRNano(nn.Module):
 
         return output
 
+    def collate_speech_batch(self, data_in, tokenizer, frontend, meta_data={}, **kwargs):
+        # prompts are left-padded so generation continues from the same position
+        for name in ("fbank", "audio_embedding", "audio_embedding_lens"):
+            kwargs.pop(name, None)  # single-utterance inputs
+        contents, outputs = [], []
+        for data in data_in:
+            contents_i = self.data_template(data)
+            outputs.append(
+                self.data_load_speech(contents_i, tokenizer, frontend, meta_data=meta_data, **kwargs)
+            )
+            contents.append(contents_i)
+
+        max_len = max(o["source_ids"].shape[1] for o in outputs)
+        max_turns = max(o["fbank_beg"].shape[1] for o in outputs)
+        source_ids, attention_mask, fbank_beg, fake_token_len = [], [], [], []
+        speech, speech_lengths = [], []
+        for o in outputs:
+            n = o["source_ids"].shape[1]
+            pad = max_len - n
+            source_ids.append(nn.functional.pad(o["source_ids"][0], (pad, 0), value=0))
+            attention_mask.append(
+                torch.cat([torch.zeros(pad, dtype=torch.int32), torch.ones(n, dtype=torch.int32)])
+            )
+            beg = o["fbank_beg"][0]
+            beg = torch.where(beg >= 0, beg + pad, beg)
+            fbank_beg.append(nn.functional.pad(beg, (0, max_turns - beg.numel()), value=-1))
+            token_len = o["fake_token_len"][0]
+            fake_token_len.append(
+                nn.functional.pad(token_len, (0, max_turns - token_len.numel()), value=0)
+            )
+            for j in range(len(o["speech"])):
+                length = int(o["speech_lengths"][j, 0])
+                speech.append(o["speech"][j, :length, :])
+                speech_lengths.append(length)
+
+        if len(speech) > 0:
+            speech = torch.nn.utils.rnn.pad_sequence(speech, batch_first=True, padding_value=0.0)
+            speech_lengths = torch.tensor(speech_lengths, dtype=torch.int32)[:, None]
+        source_ids = torch.stack(source_ids)
+        meta_data["batch_data_time"] = (
+            int(speech_lengths.sum()) * frontend.frame_shift * frontend.lfr_n / 1000
+            if len(speech) > 0
+            else 0
+        )
+        output = {
+            "speech": speech,
+            "speech_lengths": speech_lengths,
+            "fbank_beg": torch.stack(fbank_beg),
+            "fake_token_len": torch.stack(fake_token_len),
+            "input_ids": source_ids,
+            "attention_mask": torch.stack(attention_mask),
+            "source_ids": source_ids,
+        }
+        return contents, output
+
     def inference_prepare(
         self,
         data_in,
@@ -469,22 +693,32 @@ class FunASRNano(nn.Module):
     ):
         meta_data = {}
 
-        if kwargs.get("batch_size", 1) > 1:
-            raise NotImplementedError("batch decoding is not implemented")
-
-        contents = self.data_template(data_in[0])
-        output = self.data_load_speech(contents, tokenizer, frontend, meta_data=meta_data, **kwargs)
+        batched = len(data_in) > 1
+        if batched:
+            contents, output = self.collate_speech_batch(
+                data_in, tokenizer, frontend, meta_data=meta_data, **kwargs
+            )
+        else:
+            contents = self.data_template(data_in[0])
+            output = self.data_load_speech(
+                contents, tokenizer, frontend, meta_data=meta_data, **kwargs
+            )
         batch = to_device(output, kwargs["device"])
 
         # audio encoder
         speech = batch["speech"]
 
         if len(speech) > 0:
-            if "audio_embedding" in kwargs and "audio_embedding_lens" in kwargs:
+            speech_lengths = batch["speech_lengths"][:, 0]
+            if (
+                not batched
+                and kwargs.get("audio_embedding", None) is not None
+                and kwargs.get("audio_embedding_lens", None) is not None
+            ):
+                # precomputed encoder output, e.g. from SpeculativeEncoder
                 encoder_out = kwargs["audio_embedding"]
                 encoder_out_lens = kwargs["audio_embedding_lens"]
             else:
-                speech_lengths = batch["speech_lengths"][:, 0]
                 # fp16
                 if kwargs.get("fp16", False):
                     speech = speech.to(torch.float16)
@@ -493,12 +727,12 @@ class FunASRNano(nn.Module):
                 # audio encoder
                 encoder_out, encoder_out_lens = self.encode(speech, speech_lengths)
 
-                # audio_adaptor
-                adaptor_out, adaptor_out_lens = self.audio_adaptor(encoder_out, encoder_out_lens)
-                meta_data["encoder_out"] = encoder_out
-                meta_data["encoder_out_lens"] = encoder_out_lens
-                meta_data["audio_adaptor_out"] = adaptor_out
-                meta_data["audio_adaptor_out_lens"] = adaptor_out_lens
+            # audio_adaptor
+            adaptor_out, adaptor_out_lens = self.audio_adaptor(encoder_out, encoder_out_lens)
+            meta_data["encoder_out"] = encoder_out
+            meta_data["encoder_out_lens"] = encoder_out_lens
+            meta_data["audio_adaptor_out"] = adaptor_out
+            meta_data["audio_adaptor_out_lens"] = adaptor_out_lens
 
         input_ids = batch["input_ids"]
         source_ids = batch["source_ids"]
@@ -547,6 +781,84 @@ class FunASRNano(nn.Module):
                     speech_idx += 1
         return inputs_embeds, contents, batch, source_ids, meta_data
 
+    def first_pass(self, data, frontend=None, **kwargs):
+        # Encode and CTC-decode; returns (encoder_out, encoder_out_lens, ctc_text, fbank).
+        device = kwargs.get("device", "cpu")
+        fbank = kwargs.get("fbank", None)
+        with torch.no_grad():
+            if (
+                kwargs.get("audio_embedding", None) is not None
+                and kwargs.get("audio_embedding_lens", None) is not None
+            ):
+                encoder_out = kwargs["audio_embedding"]
+                encoder_out_lens = kwargs["audio_embedding_lens"]
+            else:
+                if fbank is not None:
+                    speech = fbank[None, :, :]
+                    speech_lengths = torch.tensor([fbank.shape[0]], dtype=torch.int32)
+                else:
+                    data_src = load_audio_text_image_video(data, fs=frontend.fs, **kwargs)
+                    speech, speech_lengths = extract_fbank(
+                        data_src,
+                        data_type=kwargs.get("data_type", "sound"),
+                        frontend=frontend,
+                        is_final=True,
+                    )
+                    # same [T, D] layout data_load_speech accepts as ``fbank``
+                    fbank = speech[0, : int(speech_lengths[0])]
+                # fp16
+                if kwargs.get("fp16", False):
+                    speech = speech.to(torch.float16)
+                elif kwargs.get("bf16", False):
+                    speech = speech.to(torch.bfloat16)
+                encoder_out, encoder_out_lens = self.encode(
+                    speech.to(device), speech_lengths.to(device)
+                )
+            text = ""
+            if self.ctc_decoder is not None:
+                decoder_out, _ = self.ctc_decoder(encoder_out, encoder_out_lens)
+                x = self.ctc.log_softmax(decoder_out)[0, : encoder_out_lens[0].item(), :]
+                yseq = torch.unique_consecutive(x.argmax(dim=-1), dim=-1)
+                text = self.ctc_tokenizer.decode(yseq[yseq != self.blank_id].tolist())
+        return encoder_out, encoder_out_lens, text.replace("<|nospeech|>", ""), fbank
+
+    def prefix_cache_lookup(self, prefix_ids: tuple, tag: str):
+        # private copy of the longest cached prefix, cropped to the common part
+        if DynamicCache is None or self.prefix_cache_size <= 0:
+            return None
+        best_key, best_len = None, 0
+        for key in self._prefix_cache:
+            ids, key_tag = key
+            if key_tag != tag:
+                continue
+            n = 0
+            for a, b in zip(ids, prefix_ids):
+                if a != b:
+                    break
+                n += 1
+            if n > best_len:
+                best_key, best_len = key, n
+        if best_key is None:
+            return DynamicCache()
+        # most recently used entries are evicted last
+        entry = self._prefix_cache.pop(best_key)
+        self._prefix_cache[best_key] = entry
+        past_key_values = copy.deepcopy(entry)
+        if best_len < len(best_key[0]):
+            past_key_values.crop(best_len)
+        return past_key_values
+
+    def prefix_cache_store(self, prefix_ids: tuple, tag: str, past_key_values):
+        if past_key_values is None or not hasattr(past_key_values, "crop"):
+            return
+        key = (prefix_ids, tag)
+        if key in self._prefix_cache:
+            return
+        past_key_values.crop(len(prefix_ids))
+        self._prefix_cache[key] = past_key_values
+        while len(self._prefix_cache) > self.prefix_cache_size:
+            self._prefix_cache.pop(next(iter(self._prefix_cache)))
+
     def get_prompt(self, hotwords: list[str], language: str = None, itn: bool = True):
         if len(hotwords) > 0:
             hotwords = ", ".join(hotwords)
@@ -618,10 +930,28 @@ class FunASRNano(nn.Module):
         frontend=None,
         **kwargs,
     ):
+        if kwargs.get("teacherforcing", False) and len(data_in) > 1:
+            # labels are per item, so teacher forcing scores the batch one item at a time
+            keys = key[0] if isinstance(key[0], (list, tuple)) else key
+            results, meta_data = [], {}
+            for i, data in enumerate(data_in):
+                results_i, meta_data = self.inference_llm(
+                    [data],
+                    data_lengths=None if data_lengths is None else data_lengths[i : i + 1],
+                    key=keys[i : i + 1],
+                    tokenizer=tokenizer,
+                    frontend=frontend,
+                    **kwargs,
+                )
+                results.extend(results_i)
+            return results, meta_data
+
         inputs_embeds, contents, batch, source_ids, meta_data = self.inference_prepare(
             data_in, data_lengths, key, tokenizer, frontend, **kwargs
         )
 
+        if isinstance(key[0], (list, tuple)):
+            key = key[0]
         ctc_results = []
         if self.ctc_decoder is not None:
             encoder_out = meta_data["encoder_out"]
@@ -630,8 +960,6 @@ class FunASRNano(nn.Module):
             ctc_logits = self.ctc.log_softmax(decoder_out)
 
             b, n, d = encoder_out.size()
-            if isinstance(key[0], (list, tuple)):
-                key = key[0]
             if len(key) < b:
                 key = key * b
             for i in range(b):
@@ -650,17 +978,34 @@ class FunASRNano(nn.Module):
             llm_dtype = "bf16" if kwargs.get("bf16", False) else llm_dtype
 
         device_type = torch.device(kwargs.get("device", "cuda")).type
+        contents_list = contents if isinstance(contents, list) else [contents]
         with torch.autocast(
             device_type=device_type if device_type in ["cuda", "xpu", "mps"] else "cpu",
             enabled=True if llm_dtype != "fp32" else False,
             dtype=dtype_map[llm_dtype],
         ):
-            label = contents["assistant"][-1]
+            labels = [c["assistant"][-1] for c in contents_list]
             self.llm = self.llm.to(dtype_map[llm_dtype])
             inputs_embeds = inputs_embeds.to(dtype_map[llm_dtype])
             llm_kwargs = kwargs.get("llm_kwargs", {})
             if not kwargs.get("teacherforcing", False):
                 attention_mask = batch.get("attention_mask", None)
+                # The system prompt, hotwords and instruction before the first
+                # audio token are identical across calls; reuse their KV cache.
+                prefix_ids, past_key_values = None, None
+                audio_begs = batch["fbank_beg"][0]
+                audio_begs = audio_begs[audio_begs > 0]
+                prefix_len = int(audio_begs.min().item()) if audio_begs.numel() else 0
+                if (
+                    kwargs.get("prefix_cache", True)
+                    and inputs_embeds.shape[0] == 1
+                    and prefix_len > 0
+                    and "past_key_values" not in llm_kwargs
+                ):
+                    prefix_ids = tuple(source_ids[0, :prefix_len].tolist())
+                    past_key_values = self.prefix_cache_lookup(prefix_ids, llm_dtype)
+                    if past_key_values is not None:
+                        llm_kwargs = dict(llm_kwargs, past_key_values=past_key_values)
                 generated_ids = self.llm.generate(
                     inputs_embeds=inputs_embeds,
                     attention_mask=attention_mask,
@@ -668,11 +1013,13 @@ class FunASRNano(nn.Module):
                     pad_token_id=self.llm.config.pad_token_id or self.llm.config.eos_token_id,
                     **llm_kwargs,
                 )
+                if past_key_values is not None:
+                    self.prefix_cache_store(prefix_ids, llm_dtype, past_key_values)
 
-                response = tokenizer.batch_decode(
+                responses = tokenizer.batch_decode(
                     generated_ids,
                     skip_special_tokens=kwargs.get("skip_special_tokens", True),
-                )[0]
+                )
 
                 loss = None
             else:
@@ -688,13 +1035,13 @@ class FunASRNano(nn.Module):
                 )
 
                 preds = torch.argmax(model_outputs.logits, -1)[:, source_ids.shape[1] :]
-                response = tokenizer.batch_decode(
+                responses = tokenizer.batch_decode(
                     preds,
                     add_special_tokens=False,
                     skip_special_tokens=kwargs.get("skip_special_tokens", True),
-                )[0]
+                )[:1]
                 loss = model_outputs.loss.item()
-        response = kwargs.get("prev_text", "") + response
+        responses = [kwargs.get("prev_text", "") + response for response in responses]
 
         ibest_writer = None
         if kwargs.get("output_dir") is not None:
@@ -703,16 +1050,22 @@ class FunASRNano(nn.Module):
             ibest_writer = self.writer[f"{0 + 1}best_recog"]
 
         results = []
-        response_clean = re.sub(r"[^\w\s\u3000\u4e00-\u9fff]+", "", response)
-        result_i = {
-            "key": key[0],
-            "text": re.sub(r"\s+", " ", response.replace("/sil", " ")),
-            "text_tn": response_clean,
-            "label": label,
-        }
-        if loss is not None:
-            result_i["loss"] = loss
-        results.append(result_i)
+        for i, (response, label) in enumerate(zip(responses, labels)):
+            response_clean = re.sub(r"[^\w\s\u3000\u4e00-\u9fff]+", "", response)
+            result_i = {
+                "key": key[i],
+                "text": re.sub(r"\s+", " ", response.replace("/sil", " ")),
+                "text_tn": response_clean,
+                "label": label,
+            }
+            if loss is not None:
+                result_i["loss"] = loss
+            results.append(result_i)
+
+            if ibest_writer is not None:
+                ibest_writer["text"][key[i]] = response.replace("\n", " ")
+                ibest_writer["label"][key[i]] = label.replace("\n", " ")
+                ibest_writer["text_tn"][key[i]] = response_clean
 
         for ctc_result, result in zip(ctc_results, results):
             result["ctc_text"] = ctc_result["text"].replace("<|nospeech|>", "")
@@ -730,11 +1083,6 @@ class FunASRNano(nn.Module):
                     timestamp["start_time"] = timestamp["start_time"] * 6 * 10 / 1000
                     timestamp["end_time"] = timestamp["end_time"] * 6 * 10 / 1000
 
-        if ibest_writer is not None:
-            ibest_writer["text"][key[0]] = response.replace("\n", " ")
-            ibest_writer["label"][key[0]] = label.replace("\n", " ")
-            ibest_writer["text_tn"][key[0]] = response_clean
-
         return results, meta_data
 
     @staticmethod
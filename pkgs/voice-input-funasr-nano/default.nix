@@ -96,6 +96,8 @@ let
     soundfile
     numpy
     pyyaml
+    xlib
+    jeepney
     torchPackage
     torchaudioPackage
     ps."huggingface-hub"
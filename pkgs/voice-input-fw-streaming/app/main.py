@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
+import atexit
 import os
 import queue
 import re
+import select
 import shutil
 import signal
 import subprocess
@@ -11,11 +13,30 @@ import time
 
 import numpy as np
 import sounddevice as sd
-import webrtcvad
 import yaml
 from faster_whisper import WhisperModel
 from pynput import keyboard
 
+try:
+    from Xlib import X, XK, Xatom
+    from Xlib import display as xdisplay
+    from Xlib import error as xerror
+    from Xlib.protocol import event as xevent
+except ImportError:  # python-xlib not packaged; paste through xclip/xdotool
+    xdisplay = None
+
+try:
+    import webrtcvad
+except ImportError:  # endpointing falls back to the energy gate
+    webrtcvad = None
+
+try:
+    from jeepney import DBusAddress, new_method_call
+    from jeepney.io.blocking import open_dbus_connection
+    from jeepney.wrappers import unwrap_msg
+except ImportError:  # jeepney not packaged; notify through notify-send
+    open_dbus_connection = None
+
 
 def load_config():
     path = os.getenv("VOICE_INPUT_STREAMING_CONFIG", os.path.expanduser("~/.config/voice-input-streaming/config.yaml"))
@@ -23,9 +44,122 @@ def load_config():
         return yaml.safe_load(f) or {}
 
 
+# Desktop notifications over one resident D-Bus connection, sent from a worker thread.
+class Notifier:
+    def __init__(self, title):
+        self.title = title
+        self._queue = queue.Queue()
+        self._ids = {}
+        self._conn = None
+        self._dbus_disabled = open_dbus_connection is None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def send(self, msg, expire_ms=None, slot=None):
+        self._put(("notify", slot, msg, expire_ms))
+
+    def close(self, slot):
+        self._put(("close", slot, None, None))
+
+    def flush(self, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _put(self, item):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        self._queue.put(item)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Updates pile up behind a slow daemon; only the newest per slot matters.
+            newest = {item[1]: i for i, item in enumerate(batch) if item[1] is not None}
+            for i, (kind, slot, msg, expire_ms) in enumerate(batch):
+                if slot is None or newest[slot] == i:
+                    try:
+                        self._deliver(kind, slot, msg, expire_ms)
+                    except Exception:
+                        pass
+                self._queue.task_done()
+
+    def _connection(self):
+        if self._conn is None and not self._dbus_disabled:
+            try:
+                self._conn = open_dbus_connection(bus="SESSION")
+            except Exception:
+                self._dbus_disabled = True
+        return self._conn
+
+    def _call(self, method, signature, body):
+        msg = new_method_call(
+            DBusAddress(
+                "/org/freedesktop/Notifications",
+                bus_name="org.freedesktop.Notifications",
+                interface="org.freedesktop.Notifications",
+            ),
+            method,
+            signature,
+            body,
+        )
+        return unwrap_msg(self._conn.send_and_get_reply(msg, timeout=5))
+
+    def _deliver(self, kind, slot, msg, expire_ms):
+        replace_id = self._ids.get(slot, 0) if slot is not None else 0
+        if kind == "close":
+            if not replace_id:
+                return
+            del self._ids[slot]
+        if self._connection() is not None:
+            try:
+                if kind == "close":
+                    self._call("CloseNotification", "u", (replace_id,))
+                    return
+                expire = -1 if expire_ms is None else int(expire_ms)
+                nid = self._call(
+                    "Notify",
+                    "susssasa{sv}i",
+                    (self.title, replace_id, "", self.title, msg, [], {}, expire),
+                )[0]
+                if slot is not None:
+                    self._ids[slot] = nid
+                return
+            except Exception:
+                # Reconnect on the next message; deliver this one via notify-send.
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+        if not shutil.which("notify-send"):
+            return
+        if kind == "close":
+            msg, expire_ms = " ", 1
+        cmd = ["notify-send"]
+        if replace_id:
+            cmd.extend(["-r", str(replace_id)])
+        if expire_ms is not None:
+            cmd.extend(["-t", str(int(expire_ms))])
+        cmd.extend(["-p", self.title, msg])
+        out = subprocess.run(cmd, capture_output=True, text=True, timeout=5, check=False).stdout.strip()
+        if slot is not None and kind == "notify" and out.isdigit():
+            self._ids[slot] = int(out)
+
+
+NOTIFIER = Notifier("Voice Input Streaming")
+
+
 def notify(msg):
-    if shutil.which("notify-send"):
-        subprocess.run(["notify-send", "Voice Input Streaming", msg], check=False)
+    NOTIFIER.send(msg)
 
 
 def fallback_to_whisper_writer(reason):
@@ -72,6 +206,189 @@ def is_terminal_window(window_id):
         return False
 
 
+_PASTE_KEY_NAMES = {
+    "ctrl": "Control_L",
+    "shift": "Shift_L",
+    "alt": "Alt_L",
+    "super": "Super_L",
+}
+
+
+# Resident paste path: owns CLIPBOARD and types the paste chord via XTEST.
+class X11Injector:
+    def __init__(self, focus_timeout=0.25, focus_settle=0.05):
+        if xdisplay is None:
+            raise RuntimeError("python-xlib is not installed")
+        self.focus_timeout = focus_timeout
+        self.focus_settle = focus_settle
+        self._dpy = xdisplay.Display()
+        if not self._dpy.has_extension("XTEST"):
+            self._dpy.close()
+            raise RuntimeError("X server has no XTEST extension")
+        self._sel = xdisplay.Display()
+        self._sel.set_error_handler(lambda *args: None)
+        self._clipboard = self._sel.intern_atom("CLIPBOARD")
+        self._targets = self._sel.intern_atom("TARGETS")
+        self._utf8 = self._sel.intern_atom("UTF8_STRING")
+        self._text = self._sel.intern_atom("TEXT")
+        self._text_targets = {
+            self._utf8,
+            self._text,
+            Xatom.STRING,
+            self._sel.intern_atom("text/plain"),
+            self._sel.intern_atom("text/plain;charset=utf-8"),
+        }
+        self._owner = self._sel.screen().root.create_window(0, 0, 1, 1, 0, X.CopyFromParent)
+        # Larger payloads need the INCR protocol; leave those to xclip.
+        self._max_bytes = (self._sel.info.max_request_length << 2) - 64
+        self._data = b""
+        self._latin1 = b""
+        self._data_lock = threading.Lock()
+        self._owned = threading.Event()
+        self._inject_lock = threading.Lock()
+        self._wake_r, self._wake_w = os.pipe()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        d = self._sel
+        d.flush()
+        while True:
+            while d.pending_events():
+                ev = d.next_event()
+                if ev.type == X.SelectionRequest:
+                    self._answer(ev)
+                elif ev.type == X.SelectionClear and ev.atom == self._clipboard:
+                    self._owned.clear()
+            ready, _, _ = select.select([d.fileno(), self._wake_r], [], [])
+            if self._wake_r in ready:
+                os.read(self._wake_r, 64)
+                self._owner.set_selection_owner(self._clipboard, X.CurrentTime)
+                if d.get_selection_owner(self._clipboard) == self._owner:
+                    self._owned.set()
+
+    def _answer(self, ev):
+        with self._data_lock:
+            data, latin1 = self._data, self._latin1
+        targets = self._text_targets
+        if latin1 is None:
+            targets = targets - {Xatom.STRING}
+        prop = ev.property or ev.target
+        if ev.target == self._targets:
+            ev.requestor.change_property(prop, Xatom.ATOM, 32, [self._targets, *targets])
+        elif ev.target == Xatom.STRING and latin1 is not None:
+            # STRING is Latin-1; text outside it is only offered as UTF8_STRING.
+            ev.requestor.change_property(prop, Xatom.STRING, 8, latin1)
+        elif ev.target in targets:
+            ptype = self._utf8 if ev.target == self._text else ev.target
+            ev.requestor.change_property(prop, ptype, 8, data)
+        else:
+            prop = X.NONE
+        ev.requestor.send_event(
+            xevent.SelectionNotify(
+                time=ev.time,
+                requestor=ev.requestor,
+                selection=ev.selection,
+                target=ev.target,
+                property=prop,
+            )
+        )
+        self._sel.flush()
+
+    def _take_clipboard(self, text):
+        data = text.encode("utf-8")
+        if len(data) > self._max_bytes:
+            raise RuntimeError("text too large for a single selection transfer")
+        try:
+            latin1 = text.encode("latin-1")
+        except UnicodeEncodeError:
+            latin1 = None
+        with self._data_lock:
+            self._data = data
+            self._latin1 = latin1
+        self._owned.clear()
+        os.write(self._wake_w, b"\0")
+        if not self._owned.wait(1.0):
+            raise RuntimeError("could not take clipboard ownership")
+
+    def _focus_within(self, wid):
+        win = self._dpy.get_input_focus().focus
+        for _ in range(32):
+            if isinstance(win, int) or not win.id:
+                return False
+            if win.id == wid:
+                return True
+            win = win.query_tree().parent
+        return False
+
+    def _focus(self, wid):
+        catch = xerror.CatchError()
+        self._dpy.create_resource_object("window", wid).set_input_focus(
+            X.RevertToParent, X.CurrentTime, onerror=catch
+        )
+        self._dpy.sync()
+        if catch.get_error():
+            raise RuntimeError(f"cannot focus window {wid}")
+        # The server applies focus in request order, so this normally holds on
+        # the first query; the loop only covers window managers that redirect it.
+        deadline = time.monotonic() + self.focus_timeout
+        while not self._focus_within(wid):
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"window {wid} did not take focus")
+            time.sleep(0.005)
+        # Some apps drop keys that arrive right after FocusIn.
+        time.sleep(self.focus_settle)
+
+    def _keycode(self, name):
+        code = self._dpy.keysym_to_keycode(XK.string_to_keysym(_PASTE_KEY_NAMES.get(name, name)))
+        if not code:
+            raise RuntimeError(f"no keycode for {name}")
+        return code
+
+    def _held_modifiers(self):
+        keymap = self._dpy.query_keymap()
+        return [
+            code
+            for codes in self._dpy.get_modifier_mapping()
+            for code in codes
+            if code and keymap[code >> 3] & (1 << (code & 7))
+        ]
+
+    def _send_keys(self, keys):
+        chords = [[self._keycode(k) for k in key.split("+")] for key in keys]
+        # Same effect as xdotool --clearmodifiers: lift held modifiers, then restore.
+        held = self._held_modifiers()
+        for code in held:
+            self._dpy.xtest_fake_input(X.KeyRelease, code)
+        try:
+            for chord in chords:
+                for code in chord:
+                    self._dpy.xtest_fake_input(X.KeyPress, code)
+                for code in reversed(chord):
+                    self._dpy.xtest_fake_input(X.KeyRelease, code)
+        finally:
+            for code in held:
+                self._dpy.xtest_fake_input(X.KeyPress, code)
+            self._dpy.sync()
+
+    def paste(self, window_id, text, keys):
+        with self._inject_lock:
+            self._take_clipboard(text)
+            self._focus(int(window_id))
+            self._send_keys(keys)
+
+
+def create_injector(backend):
+    if backend == "xdotool" or (backend != "xlib" and not os.environ.get("DISPLAY")):
+        return None
+    try:
+        return X11Injector()
+    except Exception as e:
+        print(f"native X11 injection unavailable, using xdotool: {e}", flush=True)
+        if backend == "xlib":
+            notify(f"inject_backend xlib unavailable, using xdotool: {e}")
+        return None
+
+
 def post_process_text(text):
     text = text.strip()
     # Normalize punctuation for dictation: colon/semicolon are often over-produced.
@@ -91,6 +408,141 @@ def post_process_text(text):
     return text
 
 
+def _norm_word(word):
+    return re.sub(r"[^\w]+", "", word.lower())
+
+
+# LocalAgreement-2 over (start, end, text) word hypotheses in absolute seconds.
+class LocalAgreement:
+    def __init__(self):
+        self.committed = []
+        self._prev = []
+
+    @property
+    def last_end(self):
+        return self.committed[-1][1] if self.committed else 0.0
+
+    def text(self):
+        return "".join(w[2] for w in self.committed)
+
+    def _new_words(self, words):
+        words = [w for w in words if w[0] > self.last_end - 0.1]
+        # The window may re-transcribe the tail of the committed text.
+        if words and self.committed and abs(words[0][0] - self.last_end) < 1.0:
+            for n in range(min(5, len(words), len(self.committed)), 0, -1):
+                tail = [_norm_word(w[2]) for w in self.committed[-n:]]
+                if tail == [_norm_word(w[2]) for w in words[:n]]:
+                    words = words[n:]
+                    break
+        return words
+
+    def insert(self, words):
+        words = self._new_words(words)
+        n = 0
+        while (
+            n < len(words)
+            and n < len(self._prev)
+            and _norm_word(words[n][2]) == _norm_word(self._prev[n][2])
+        ):
+            n += 1
+        self.committed.extend(words[:n])
+        self._prev = words[n:]
+        return words[:n]
+
+    def finalize(self, words):
+        words = self._new_words(words)
+        self.committed.extend(words)
+        self._prev = []
+        return words
+
+
+def load_silero_vad():
+    # faster-whisper >= 1.1 ships Silero as a batched ONNX model; older
+    # releases expose a stateful per-window API that is not used here.
+    try:
+        from faster_whisper.vad import get_vad_model
+
+        model = get_vad_model()
+        model(np.zeros(1024, dtype=np.float32))
+        return model
+    except Exception:
+        return None
+
+
+# Energy/ZCR gate first, then batched Silero (or webrtcvad) with smoothing across chunks.
+class ChunkVad:
+    def __init__(self, sample_rate, backend="auto", aggressiveness=2, gate_db=-50.0, threshold=0.5):
+        self.sample_rate = sample_rate
+        self.aggressiveness = aggressiveness
+        self.gate_db = gate_db
+        self.threshold = threshold
+        self.prob = 0.0
+        self._history = np.zeros(2, dtype=np.float32)
+        self._silero = None
+        self._webrtc = None
+        if backend in ("auto", "silero") and sample_rate == 16000:
+            self._silero = load_silero_vad()
+        if self._silero is None and backend != "energy" and webrtcvad is not None:
+            self._webrtc = webrtcvad.Vad(aggressiveness)
+        # Silero scores 512-sample windows; webrtcvad takes 30 ms frames.
+        self.frame_len = 512 if self._silero is not None else int(sample_rate * 0.03)
+
+    @property
+    def backend(self):
+        if self._silero is not None:
+            return "silero"
+        return "webrtc" if self._webrtc is not None else "energy"
+
+    def reset(self):
+        self.prob = 0.0
+        self._history[:] = 0.0
+
+    def _frame_probs(self, chunk):
+        n = chunk.shape[0] // self.frame_len
+        frames = chunk[: n * self.frame_len].reshape(n, self.frame_len)
+        x = frames.astype(np.float32)
+        power = np.einsum("ij,ij->i", x, x) / np.float32(self.frame_len * 32768.0 * 32768.0)
+        db = 10.0 * np.log10(power + 1e-12)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / np.float32(self.frame_len - 1)
+        # Quiet hiss crosses zero far more often than voiced speech.
+        gate = (db > self.gate_db) & ~((zcr > 0.5) & (db < self.gate_db + 15.0))
+        probs = np.zeros(n, dtype=np.float32)
+        if not gate.any():
+            return probs
+        if self._silero is not None:
+            try:
+                out = np.asarray(self._silero(x.reshape(-1) / np.float32(32768.0)), dtype=np.float32)
+                probs[:] = out.reshape(-1)[:n]
+                probs[~gate] = 0.0
+                return probs
+            except Exception as e:
+                self._silero = None
+                if webrtcvad is not None:
+                    self._webrtc = webrtcvad.Vad(self.aggressiveness)
+                    self.frame_len = int(self.sample_rate * 0.03)
+                print(f"silero vad failed, using {self.backend}: {e}", flush=True)
+                return self._frame_probs(chunk)
+        if self._webrtc is not None:
+            for i in np.flatnonzero(gate):
+                probs[i] = float(self._webrtc.is_speech(frames[i].tobytes(), self.sample_rate))
+        else:
+            probs[gate] = 1.0
+        return probs
+
+    def update(self, chunk):
+        probs = self._frame_probs(chunk)
+        if probs.size == 0:
+            return False
+        padded = np.concatenate((self._history, probs))
+        smooth = np.convolve(padded, np.full(3, 1.0 / 3.0, dtype=np.float32), mode="valid")
+        self._history = padded[-2:]
+        self.prob = float(smooth[-1])
+        # smooth[0] is centred on the previous chunk; counting it would hold
+        # the endpoint open for one extra chunk after speech stops.
+        return bool(smooth[1:].max(initial=0.0) >= self.threshold)
+
+
 class App:
     def __init__(self, cfg):
         self.cfg = cfg
@@ -100,6 +552,13 @@ class App:
         self.chunk_ms = int(s.get("chunk_ms", 320))
         self.endpoint_ms = int(s.get("endpoint_ms", 260))
         self.max_utterance_ms = int(s.get("max_utterance_ms", 12000))
+        self.partial_decode = bool(s.get("partial_decode", True))
+        self.partial_interval_ms = int(s.get("partial_interval_ms", 1000))
+        self.long_form = bool(s.get("long_form", False))
+        self.segment_max_ms = max(3000, int(s.get("segment_max_ms", 10000)))
+        self.long_form_max_ms = int(s.get("long_form_max_ms", 600000))
+        # Long-form segments are closed by the incremental decoder.
+        self.partial_decode = self.partial_decode or self.long_form
         self.language = m.get("language")
         self.initial_prompt = m.get("initial_prompt")
         self.temperature = float(m.get("temperature", 0.0))
@@ -110,7 +569,10 @@ class App:
             device=m["device"],
             compute_type=m["compute_type"],
         )
-        self.vad = webrtcvad.Vad(2)
+        self.vad = ChunkVad(
+            self.sample_rate, backend=str(s.get("vad_backend", "auto")).strip().lower()
+        )
+        self._injector = create_injector(str(cfg.get("inject_backend", "auto")).strip().lower())
 
         self.required_keys = set()
         for raw in cfg["hotkey"].split("+"):
@@ -129,6 +591,10 @@ class App:
         self._last_speech_ts = 0.0
         self._target_window = None
         self._lock = threading.Lock()
+        self._agreement = None
+        self._window_start = 0
+        self._window_lock = threading.Lock()
+        self._partial_thread = None
 
     def run(self):
         listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
@@ -172,16 +638,6 @@ class App:
             return
         self._q.put(indata.copy())
 
-    def _chunk_has_speech(self, chunk):
-        pcm = chunk.astype(np.int16).tobytes()
-        frame_len = int(self.sample_rate * 0.03) * 2
-        if len(pcm) < frame_len:
-            return False
-        for i in range(0, len(pcm) - frame_len + 1, frame_len):
-            if self.vad.is_speech(pcm[i:i + frame_len], self.sample_rate):
-                return True
-        return False
-
     def toggle_recording(self):
         with self._lock:
             if self._recording:
@@ -191,6 +647,9 @@ class App:
             self._recording = True
             self._frames = []
             self._last_speech_ts = time.time()
+            self.vad.reset()
+            self._agreement = LocalAgreement()
+            self._window_start = 0
             self.save_active_window()
             notify("Recording... (press hotkey again to stop)")
             threading.Thread(target=self.record_loop, daemon=True).start()
@@ -198,6 +657,11 @@ class App:
     def record_loop(self):
         blocksize = max(1, int(self.sample_rate * self.chunk_ms / 1000))
         started = time.time()
+        limit_ms = self.long_form_max_ms if self.long_form else self.max_utterance_ms
+        self._partial_thread = None
+        if self.partial_decode:
+            self._partial_thread = threading.Thread(target=self.partial_decode_loop, daemon=True)
+            self._partial_thread.start()
         try:
             with sd.InputStream(
                 samplerate=self.sample_rate,
@@ -209,7 +673,7 @@ class App:
                 while True:
                     if not self._recording:
                         break
-                    if (time.time() - started) * 1000 > self.max_utterance_ms:
+                    if (time.time() - started) * 1000 > limit_ms:
                         self._recording = False
                         break
                     try:
@@ -217,30 +681,128 @@ class App:
                     except queue.Empty:
                         continue
                     self._frames.append(chunk)
-                    if self._chunk_has_speech(chunk):
+                    if self.vad.update(chunk):
                         self._last_speech_ts = time.time()
-                    elif (time.time() - self._last_speech_ts) * 1000 > self.endpoint_ms and len(self._frames) > 2:
+                    elif (
+                        not self.long_form
+                        and (time.time() - self._last_speech_ts) * 1000 > self.endpoint_ms
+                        and len(self._frames) > 2
+                    ):
                         self._recording = False
                         break
         except Exception as e:
+            self._recording = False
             print(f"audio error: {e}")
             return
         self.finish_transcription()
 
-    def finish_transcription(self):
-        if not self._frames:
-            notify("Done (no audio)")
-            return
-        audio = np.concatenate(self._frames).astype(np.float32) / 32768.0
+    def _window_prompt(self):
+        committed = self._agreement.text()[-200:] if self._agreement else ""
+        parts = [p for p in (self.initial_prompt, committed.strip()) if p]
+        return " ".join(parts) or None
+
+    def decode_words(self, audio, offset_s):
         segments, _ = self.model.transcribe(
             audio=audio,
             language=self.language,
-            initial_prompt=self.initial_prompt,
+            initial_prompt=self._window_prompt(),
             condition_on_previous_text=False,
             temperature=self.temperature,
             vad_filter=self.vad_filter,
+            word_timestamps=True,
         )
-        text = "".join(seg.text for seg in segments)
+        words = []
+        for seg in segments:
+            for w in seg.words or []:
+                words.append((offset_s + w.start, offset_s + w.end, w.word))
+        return words
+
+    def _window_audio(self, frames, start):
+        # Concatenate only the chunks that overlap the uncommitted window.
+        sizes = np.cumsum([len(f) for f in frames])
+        first = int(np.searchsorted(sizes, start, side="right"))
+        if first >= len(frames):
+            return np.zeros(0, dtype=np.float32)
+        base = int(sizes[first - 1]) if first else 0
+        return np.concatenate(frames[first:])[start - base:].astype(np.float32) / 32768.0
+
+    def partial_decode_loop(self):
+        # Re-decode the uncommitted window while recording. Committed words
+        # move the window start forward, so only the tail is left at endpoint.
+        interval = max(0.1, self.partial_interval_ms / 1000.0)
+        min_samples = int(self.sample_rate * 0.5)
+        segment_samples = int(self.sample_rate * self.segment_max_ms / 1000)
+        decoded_samples = 0
+        errors = 0
+        agreement = self._agreement
+        while self._recording and self._agreement is agreement:
+            time.sleep(interval * (1 + min(errors, 8)))
+            if not self._recording:
+                break
+            frames = list(self._frames)
+            total = sum(len(f) for f in frames)
+            if total - decoded_samples < min_samples // 2 or total - self._window_start < min_samples:
+                continue
+            start = self._window_start
+            audio = self._window_audio(frames, start)
+            try:
+                words = self.decode_words(audio, start / self.sample_rate)
+            except Exception as e:
+                errors += 1
+                print(f"partial decode error: {e}")
+                continue
+            errors = 0
+            decoded_samples = total
+            with self._window_lock:
+                # The endpoint does not wait for this decode; drop a result that
+                # lands after it so the tail is decoded from a stable window.
+                if not self._recording or self._agreement is not agreement:
+                    break
+                self._apply_window_words(words, total, segment_samples)
+
+    def _apply_window_words(self, words, total, segment_samples):
+        if self.long_form and total - self._window_start > segment_samples:
+            # Hypotheses kept disagreeing for a whole segment; commit what is
+            # safely behind the live edge so the window stays bounded.
+            edge = total / self.sample_rate - 1.0
+            self._agreement.finalize([w for w in words if w[1] <= edge])
+            # Every word before the edge is now committed, so move past it
+            # even when the segment held no words at all (silence).
+            self._window_start = max(
+                self._window_start,
+                int(self._agreement.last_end * self.sample_rate),
+                total - self.sample_rate,
+            )
+            return
+        committed = self._agreement.insert(words)
+        if committed:
+            self._window_start = min(total, int(self._agreement.last_end * self.sample_rate))
+
+    def finish_transcription(self):
+        self._partial_thread = None
+        if not self._frames:
+            notify("Done (no audio)")
+            return
+        if self.partial_decode:
+            with self._window_lock:
+                frames = list(self._frames)
+                agreement = self._agreement
+                start = self._window_start
+            tail = self._window_audio(frames, start)
+            words = self.decode_words(tail, start / self.sample_rate) if tail.size else []
+            agreement.finalize(words)
+            text = agreement.text()
+        else:
+            audio = np.concatenate(self._frames).astype(np.float32) / 32768.0
+            segments, _ = self.model.transcribe(
+                audio=audio,
+                language=self.language,
+                initial_prompt=self.initial_prompt,
+                condition_on_previous_text=False,
+                temperature=self.temperature,
+                vad_filter=self.vad_filter,
+            )
+            text = "".join(seg.text for seg in segments)
         text = post_process_text(text)
         if text:
             self.inject_text(text)
@@ -253,6 +815,12 @@ class App:
         if not wid:
             return
         is_term = is_terminal_window(wid)
+        if self._injector is not None:
+            try:
+                self._injector.paste(wid, text, ["ctrl+shift+v" if is_term else "ctrl+v"])
+                return
+            except Exception as e:
+                print(f"native paste failed, using xdotool: {e}", flush=True)
         try:
             p = subprocess.Popen(["xclip", "-selection", "clipboard"], stdin=subprocess.PIPE)
             p.communicate(input=text.encode("utf-8"), timeout=2)
@@ -28,6 +28,8 @@ let
     pyyaml
     webrtcvad
     setuptools
+    xlib
+    jeepney
   ]);
 
   runtimeLibs = [
@@ -28,13 +28,15 @@ let
     sha256 = "0pr01qlbb2qnsgs1zrjzm0mb293id32fiw9aaypdx4r6wkya2qjl";
   };
 
-  pythonEnv = python3.withPackages (ps: with ps; [
+  pythonEnv = python3.withPackages (ps: (with ps; [
     pynput
     sounddevice
     soundfile
     numpy
     pyyaml
-  ]);
+    xlib
+    jeepney
+  ]) ++ lib.optionals (ps ? sherpa-onnx) [ ps.sherpa-onnx ]);
 
   runtimePath = lib.makeBinPath [
     coreutils
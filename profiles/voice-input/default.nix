@@ -53,6 +53,12 @@ in
       description = "Preferred backend for service tuning.";
     };
 
+    injectBackend = lib.mkOption {
+      type = lib.types.enum [ "auto" "xlib" "xdotool" ];
+      default = "auto";
+      description = "Text injection path for the streaming, sherpa-onnx and funasr-nano engines: resident X11 connection (xlib), xclip/xdotool subprocesses, or auto.";
+    };
+
     streaming = {
       model = lib.mkOption {
         type = lib.types.enum [ "small" "medium" "large-v3" "turbo" ];
@@ -89,6 +95,42 @@ in
         default = 12000;
         description = "Maximum utterance duration before forced finalize.";
       };
+
+      longForm = lib.mkOption {
+        type = lib.types.bool;
+        default = false;
+        description = "Long-form dictation: lift maxUtteranceMs, split audio at pauses and decode segments while recording.";
+      };
+
+      segmentMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 10000;
+        description = "Longest segment decoded at once in long-form mode.";
+      };
+
+      longFormMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 600000;
+        description = "Recording limit in long-form mode.";
+      };
+
+      partialDecode = lib.mkOption {
+        type = lib.types.bool;
+        default = true;
+        description = "Decode while recording and commit words that two consecutive hypotheses agree on.";
+      };
+
+      partialIntervalMs = lib.mkOption {
+        type = lib.types.int;
+        default = 1000;
+        description = "Interval between incremental decodes while recording.";
+      };
+
+      vadBackend = lib.mkOption {
+        type = lib.types.enum [ "auto" "silero" "webrtc" "energy" ];
+        default = "auto";
+        description = "Endpoint VAD for the streaming service: Silero from faster-whisper, webrtcvad, or the NumPy energy gate alone.";
+      };
     };
 
     sherpa = {
@@ -122,6 +164,48 @@ in
         description = "Maximum utterance duration before forced finalize.";
       };
 
+      longForm = lib.mkOption {
+        type = lib.types.bool;
+        default = false;
+        description = "Long-form dictation: lift maxUtteranceMs, split audio at pauses and decode segments while recording.";
+      };
+
+      segmentMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 10000;
+        description = "Longest segment decoded at once in long-form mode.";
+      };
+
+      longFormMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 600000;
+        description = "Recording limit in long-form mode.";
+      };
+
+      warmStream = lib.mkOption {
+        type = lib.types.bool;
+        default = true;
+        description = "Keep the microphone stream open between utterances so capture starts instantly with pre-roll.";
+      };
+
+      prerollMs = lib.mkOption {
+        type = lib.types.int;
+        default = 300;
+        description = "Audio kept from before the hotkey press when warmStream is on.";
+      };
+
+      vadTrim = lib.mkOption {
+        type = lib.types.bool;
+        default = true;
+        description = "Trim leading and trailing silence with an energy VAD before decoding.";
+      };
+
+      vadMaxPauseMs = lib.mkOption {
+        type = lib.types.int;
+        default = 0;
+        description = "Shorten internal pauses longer than this before decoding (0 keeps them).";
+      };
+
       punctuationPolicy = lib.mkOption {
         type = lib.types.enum [ "light-normalize" "asr-raw" ];
         default = "light-normalize";
@@ -134,6 +218,24 @@ in
         description = "Hotkey interaction mode for sherpa-onnx.";
       };
 
+      backend = lib.mkOption {
+        type = lib.types.enum [ "auto" "python" "cli" ];
+        default = "auto";
+        description = "sherpa-onnx decoding backend: resident Python recognizer, per-utterance CLI, or auto.";
+      };
+
+      numThreads = lib.mkOption {
+        type = lib.types.either lib.types.ints.positive (lib.types.enum [ "auto" ]);
+        default = 2;
+        description = "onnxruntime threads for sherpa-onnx; \"auto\" times a reference clip once per machine and keeps the fastest.";
+      };
+
+      provider = lib.mkOption {
+        type = lib.types.str;
+        default = "cpu";
+        description = "onnxruntime execution provider for sherpa-onnx (cpu, cuda, ...).";
+      };
+
       feedback = {
         recordingNotify = lib.mkOption {
           type = lib.types.bool;
@@ -230,6 +332,48 @@ in
         description = "Maximum utterance duration before forced finalize.";
       };
 
+      longForm = lib.mkOption {
+        type = lib.types.bool;
+        default = false;
+        description = "Long-form dictation: lift maxUtteranceMs, split audio at pauses and decode segments while recording.";
+      };
+
+      segmentMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 10000;
+        description = "Longest segment decoded at once in long-form mode.";
+      };
+
+      longFormMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 600000;
+        description = "Recording limit in long-form mode.";
+      };
+
+      warmStream = lib.mkOption {
+        type = lib.types.bool;
+        default = true;
+        description = "Keep the microphone stream open between utterances so capture starts instantly with pre-roll.";
+      };
+
+      prerollMs = lib.mkOption {
+        type = lib.types.int;
+        default = 300;
+        description = "Audio kept from before the hotkey press when warmStream is on.";
+      };
+
+      vadTrim = lib.mkOption {
+        type = lib.types.bool;
+        default = true;
+        description = "Trim leading and trailing silence with an energy VAD before decoding.";
+      };
+
+      vadMaxPauseMs = lib.mkOption {
+        type = lib.types.int;
+        default = 0;
+        description = "Shorten internal pauses longer than this before decoding (0 keeps them).";
+      };
+
       punctuationPolicy = lib.mkOption {
         type = lib.types.enum [ "light-normalize" "asr-raw" ];
         default = "light-normalize";
@@ -254,6 +398,12 @@ in
         description = "Hotword boost weight used by funasr-nano.";
       };
 
+      hotwordTopK = lib.mkOption {
+        type = lib.types.int;
+        default = 32;
+        description = "Tech lexicon entries picked per utterance for the funasr-nano prompt (0 = whole lexicon).";
+      };
+
       learningMinHits = lib.mkOption {
         type = lib.types.int;
         default = 2;
@@ -284,6 +434,12 @@ in
         description = "Torch CPU threads used by funasr-nano.";
       };
 
+      speculativeEncoder = lib.mkOption {
+        type = lib.types.bool;
+        default = false;
+        description = "Encode captured audio in overlapping windows while recording so only the tail is encoded after release.";
+      };
+
       feedback = {
         recordingNotify = lib.mkOption {
           type = lib.types.bool;
@@ -366,6 +522,7 @@ in
         hotkey = cfg.hotkey;
         autoStart = cfg.autoStart;
         backend = cfg.backend;
+        injectBackend = cfg.injectBackend;
         streaming = cfg.streaming;
         sherpa = cfg.sherpa;
         funasrNano = cfg.funasrNano;
@@ -79,6 +79,12 @@ in
       description = "Desktop backend preference for runtime tuning.";
     };
 
+    injectBackend = lib.mkOption {
+      type = lib.types.enum [ "auto" "xlib" "xdotool" ];
+      default = "auto";
+      description = "Text injection path for the streaming, sherpa-onnx and funasr-nano engines: resident X11 connection (xlib), xclip/xdotool subprocesses, or auto.";
+    };
+
     streaming = {
       model = lib.mkOption {
         type = lib.types.enum [ "small" "medium" "large-v3" "turbo" ];
@@ -127,6 +133,42 @@ in
         default = 12000;
         description = "Maximum utterance length in milliseconds.";
       };
+
+      longForm = lib.mkOption {
+        type = lib.types.bool;
+        default = false;
+        description = "Long-form dictation: lift maxUtteranceMs, split audio at pauses and decode segments while recording.";
+      };
+
+      segmentMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 10000;
+        description = "Longest segment decoded at once in long-form mode.";
+      };
+
+      longFormMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 600000;
+        description = "Recording limit in long-form mode.";
+      };
+
+      partialDecode = lib.mkOption {
+        type = lib.types.bool;
+        default = true;
+        description = "Decode while recording and commit words that two consecutive hypotheses agree on.";
+      };
+
+      partialIntervalMs = lib.mkOption {
+        type = lib.types.int;
+        default = 1000;
+        description = "Interval between incremental decodes while recording.";
+      };
+
+      vadBackend = lib.mkOption {
+        type = lib.types.enum [ "auto" "silero" "webrtc" "energy" ];
+        default = "auto";
+        description = "Endpoint VAD for the streaming service: Silero from faster-whisper, webrtcvad, or the NumPy energy gate alone.";
+      };
     };
 
     sherpa = {
@@ -160,6 +202,48 @@ in
         description = "Maximum utterance length in milliseconds.";
       };
 
+      longForm = lib.mkOption {
+        type = lib.types.bool;
+        default = false;
+        description = "Long-form dictation: lift maxUtteranceMs, split audio at pauses and decode segments while recording.";
+      };
+
+      segmentMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 10000;
+        description = "Longest segment decoded at once in long-form mode.";
+      };
+
+      longFormMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 600000;
+        description = "Recording limit in long-form mode.";
+      };
+
+      warmStream = lib.mkOption {
+        type = lib.types.bool;
+        default = true;
+        description = "Keep the microphone stream open between utterances so capture starts instantly with pre-roll.";
+      };
+
+      prerollMs = lib.mkOption {
+        type = lib.types.int;
+        default = 300;
+        description = "Audio kept from before the hotkey press when warmStream is on.";
+      };
+
+      vadTrim = lib.mkOption {
+        type = lib.types.bool;
+        default = true;
+        description = "Trim leading and trailing silence with an energy VAD before decoding.";
+      };
+
+      vadMaxPauseMs = lib.mkOption {
+        type = lib.types.int;
+        default = 0;
+        description = "Shorten internal pauses longer than this before decoding (0 keeps them).";
+      };
+
       punctuationPolicy = lib.mkOption {
         type = lib.types.enum [ "light-normalize" "asr-raw" ];
         default = "light-normalize";
@@ -172,6 +256,24 @@ in
         description = "Hotkey interaction mode for sherpa-onnx.";
       };
 
+      backend = lib.mkOption {
+        type = lib.types.enum [ "auto" "python" "cli" ];
+        default = "auto";
+        description = "sherpa-onnx decoding backend: resident Python recognizer, per-utterance CLI, or auto.";
+      };
+
+      numThreads = lib.mkOption {
+        type = lib.types.either lib.types.ints.positive (lib.types.enum [ "auto" ]);
+        default = 2;
+        description = "onnxruntime threads for sherpa-onnx; \"auto\" times a reference clip once per machine and keeps the fastest.";
+      };
+
+      provider = lib.mkOption {
+        type = lib.types.str;
+        default = "cpu";
+        description = "onnxruntime execution provider for sherpa-onnx (cpu, cuda, ...).";
+      };
+
       feedback = {
         recordingNotify = lib.mkOption {
           type = lib.types.bool;
@@ -268,6 +370,48 @@ in
         description = "Maximum utterance length in milliseconds.";
       };
 
+      longForm = lib.mkOption {
+        type = lib.types.bool;
+        default = false;
+        description = "Long-form dictation: lift maxUtteranceMs, split audio at pauses and decode segments while recording.";
+      };
+
+      segmentMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 10000;
+        description = "Longest segment decoded at once in long-form mode.";
+      };
+
+      longFormMaxMs = lib.mkOption {
+        type = lib.types.int;
+        default = 600000;
+        description = "Recording limit in long-form mode.";
+      };
+
+      warmStream = lib.mkOption {
+        type = lib.types.bool;
+        default = true;
+        description = "Keep the microphone stream open between utterances so capture starts instantly with pre-roll.";
+      };
+
+      prerollMs = lib.mkOption {
+        type = lib.types.int;
+        default = 300;
+        description = "Audio kept from before the hotkey press when warmStream is on.";
+      };
+
+      vadTrim = lib.mkOption {
+        type = lib.types.bool;
+        default = true;
+        description = "Trim leading and trailing silence with an energy VAD before decoding.";
+      };
+
+      vadMaxPauseMs = lib.mkOption {
+        type = lib.types.int;
+        default = 0;
+        description = "Shorten internal pauses longer than this before decoding (0 keeps them).";
+      };
+
       punctuationPolicy = lib.mkOption {
         type = lib.types.enum [ "light-normalize" "asr-raw" ];
         default = "light-normalize";
@@ -292,6 +436,12 @@ in
         description = "Hotword boost weight used by funasr-nano.";
       };
 
+      hotwordTopK = lib.mkOption {
+        type = lib.types.int;
+        default = 32;
+        description = "Tech lexicon entries picked per utterance for the funasr-nano prompt (0 = whole lexicon).";
+      };
+
       learningMinHits = lib.mkOption {
         type = lib.types.int;
         default = 2;
@@ -322,6 +472,12 @@ in
         description = "Torch CPU threads used by funasr-nano.";
       };
 
+      speculativeEncoder = lib.mkOption {
+        type = lib.types.bool;
+        default = false;
+        description = "Encode captured audio in overlapping windows while recording so only the tail is encoded after release.";
+      };
+
       feedback = {
         recordingNotify = lib.mkOption {
           type = lib.types.bool;
@@ -453,6 +609,7 @@ in
       force = true;
       text = ''
       hotkey: ${cfg.hotkey}
+      inject_backend: ${cfg.injectBackend}
 
       model:
         name: ${cfg.streaming.model}
@@ -468,6 +625,12 @@ in
         chunk_ms: ${toString cfg.streaming.chunkMs}
         endpoint_ms: ${toString cfg.streaming.endpointMs}
         max_utterance_ms: ${toString cfg.streaming.maxUtteranceMs}
+        long_form: ${if cfg.streaming.longForm then "true" else "false"}
+        segment_max_ms: ${toString cfg.streaming.segmentMaxMs}
+        long_form_max_ms: ${toString cfg.streaming.longFormMaxMs}
+        partial_decode: ${if cfg.streaming.partialDecode then "true" else "false"}
+        partial_interval_ms: ${toString cfg.streaming.partialIntervalMs}
+        vad_backend: ${cfg.streaming.vadBackend}
 
       fallback:
         auto_to_whisper_writer: ${if cfg.fallback.autoToWhisperWriter then "true" else "false"}
@@ -478,6 +641,7 @@ in
       force = true;
       text = ''
       hotkey: ${cfg.hotkey}
+      inject_backend: ${cfg.injectBackend}
 
       sherpa:
         model: ${cfg.sherpa.model}
@@ -485,8 +649,18 @@ in
         chunk_ms: ${toString cfg.sherpa.chunkMs}
         endpoint_ms: ${toString cfg.sherpa.endpointMs}
         max_utterance_ms: ${toString cfg.sherpa.maxUtteranceMs}
+        long_form: ${if cfg.sherpa.longForm then "true" else "false"}
+        segment_max_ms: ${toString cfg.sherpa.segmentMaxMs}
+        long_form_max_ms: ${toString cfg.sherpa.longFormMaxMs}
+        warm_stream: ${if cfg.sherpa.warmStream then "true" else "false"}
+        preroll_ms: ${toString cfg.sherpa.prerollMs}
+        vad_trim: ${if cfg.sherpa.vadTrim then "true" else "false"}
+        vad_max_pause_ms: ${toString cfg.sherpa.vadMaxPauseMs}
         punctuation_policy: ${cfg.sherpa.punctuationPolicy}
         interaction_mode: ${cfg.sherpa.interactionMode}
+        backend: ${cfg.sherpa.backend}
+        num_threads: ${toString cfg.sherpa.numThreads}
+        provider: ${cfg.sherpa.provider}
         feedback:
           recording_notify: ${if cfg.sherpa.feedback.recordingNotify then "true" else "false"}
           thinking_notify: ${if cfg.sherpa.feedback.thinkingNotify then "true" else "false"}
@@ -507,6 +681,7 @@ in
       force = true;
       text = ''
       hotkey: ${cfg.hotkey}
+      inject_backend: ${cfg.injectBackend}
 
       funasr_nano:
         model: ${cfg.funasrNano.model}
@@ -516,15 +691,24 @@ in
         chunk_ms: ${toString cfg.funasrNano.chunkMs}
         endpoint_ms: ${toString cfg.funasrNano.endpointMs}
         max_utterance_ms: ${toString cfg.funasrNano.maxUtteranceMs}
+        long_form: ${if cfg.funasrNano.longForm then "true" else "false"}
+        segment_max_ms: ${toString cfg.funasrNano.segmentMaxMs}
+        long_form_max_ms: ${toString cfg.funasrNano.longFormMaxMs}
+        warm_stream: ${if cfg.funasrNano.warmStream then "true" else "false"}
+        preroll_ms: ${toString cfg.funasrNano.prerollMs}
+        vad_trim: ${if cfg.funasrNano.vadTrim then "true" else "false"}
+        vad_max_pause_ms: ${toString cfg.funasrNano.vadMaxPauseMs}
         punctuation_policy: ${cfg.funasrNano.punctuationPolicy}
         interaction_mode: ${cfg.funasrNano.interactionMode}
         hotword_boost_enable: ${if cfg.funasrNano.hotwordBoostEnable then "true" else "false"}
         hotword_boost_weight: ${toString cfg.funasrNano.hotwordBoostWeight}
+        hotword_top_k: ${toString cfg.funasrNano.hotwordTopK}
         learning_min_hits: ${toString cfg.funasrNano.learningMinHits}
         auto_learn_enable: ${if cfg.funasrNano.autoLearnEnable then "true" else "false"}
         warmup_on_start: ${if cfg.funasrNano.warmupOnStart then "true" else "false"}
         warmup_blocking_start: ${if cfg.funasrNano.warmupBlockingStart then "true" else "false"}
         torch_num_threads: ${toString cfg.funasrNano.torchNumThreads}
+        speculative_encoder: ${if cfg.funasrNano.speculativeEncoder then "true" else "false"}
         feedback:
           recording_notify: ${if cfg.funasrNano.feedback.recordingNotify then "true" else "false"}
           thinking_notify: ${if cfg.funasrNano.feedback.thinkingNotify then "true" else "false"}